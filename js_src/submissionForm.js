@@ -169,6 +169,26 @@ const Step2 = ({ athlete, scores, toContact, onComplete, submitFinal }) => {
 };
 
 
+// Score to handicap tables by round codename, so each round is only fetched once
+const handicapTables = {};
+
+const loadHandicapTable = (rnd) => {
+    if (!handicapTables[rnd.codename]) {
+        var url = new URL(rnd.handicapTable, window.location.href);
+        handicapTables[rnd.codename] = fetch(url).then((response) => {
+            if (!response.ok) {
+                throw new Error('API ERROR: Handicap table request failed with response code ' + response.status);
+            }
+            return response.json();
+        }).catch((err) => {
+            delete handicapTables[rnd.codename];
+            throw err;
+        });
+    }
+    return handicapTables[rnd.codename];
+};
+
+
 const Step3 = ({ events, scores, addScore, toContact, onComplete, submitFinal }) => {
     const [addedScores, setAddedScores] = useState([]);
     const [currentEvent, setCurrentEvent] = useState("");
@@ -217,26 +237,33 @@ const Step3 = ({ events, scores, addScore, toContact, onComplete, submitFinal })
         setCurrentRound(e.target.value);
         setCurrentScore("");
         setHc(null);
+        if (e.target.value) {
+            loadHandicapTable(ev.rounds.find((r) => r.codename === e.target.value)).catch((err) => {
+                console.error(err);
+            });
+        }
     }
     const setScore = (e) => {
         setError(null);
         setCurrentScore(e.target.value);
         setHc(null);
-        setLoading(true);
         if (!e.target.value) {
             return;
         }
-        var url = new URL('/api/handicap/', window.location.href);
-        var params = { round: currentRound, score: e.target.value };
-        url.search = new URLSearchParams(params).toString();
-        fetch(url).then((response) => response.json()).then((data) => {
-            setLoading(false);
-            if (data.error) {
-                console.error(data.error);
+        setLoading(true);
+        const score = e.target.value;
+        loadHandicapTable(rnd).then((table) => {
+            const handicap = table.handicaps[Number(score)];
+            if (!Number.isInteger(Number(score)) || handicap === undefined || handicap === null) {
                 setError({ message: "Invalid score" });
                 return;
             }
-            setHc(data.handicap);
+            setHc(handicap);
+        }).catch((err) => {
+            console.error(err);
+            setError({ message: "Could not load handicaps, please try again" });
+        }).finally(() => {
+            setLoading(false);
         });
     }
     const onAddScore = (e) => {
@@ -117,6 +117,7 @@ const VerifyFlow = () => {
     const [current, setCurrent] = useState(null);
     const [next, setNext] = useState(null);
     const [count, setCount] = useState(null);
+    const [nextPage, setNextPage] = useState(null);
     const { error, loading, load } = useLoadData('scores-to-verify')
     const athleteLoadData = useLoadData('submission-details');
     const errorAthlete = athleteLoadData.error;
@@ -127,7 +128,8 @@ const VerifyFlow = () => {
         e.preventDefault();
         load().then((data) => {
             setToVerify(data.toVerify)
-            setCount(data.toVerify.length);
+            setNextPage(data.next);
+            setCount(data.count);
             if (data.toVerify.length) {
                 setNext(data.toVerify[0]);
             }
@@ -145,7 +147,15 @@ const VerifyFlow = () => {
                     newScores: data.newScores,
                 });
                 const index = toVerify.map(a => a.id).indexOf(id);
-                setNext(toVerify[index + 1]);
+                if (index + 1 === toVerify.length && nextPage) {
+                    load({ after: nextPage }).then((page) => {
+                        setToVerify(toVerify.concat(page.toVerify));
+                        setNextPage(page.next);
+                        setNext(page.toVerify[0]);
+                    });
+                } else {
+                    setNext(toVerify[index + 1]);
+                }
             });
         };
     };
@@ -1,19 +1,24 @@
-from django.conf import settings
 from django.contrib import admin, messages
-from django.db import transaction
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 
-import requests
 from django_object_actions import DjangoObjectActions, action
 
-from archerydjango.fields import DbAges, DbBowstyles, DbGender
-from archerydjango.utils import get_age_group
-
-from .allowed_rounds import all_rounds, get_allowed_rounds
+from . import results_files, staging
+from .forms import ImportUploadForm, ResultsFileForm, UnknownAthletesForm
+from .jobs import enqueue, enqueue_once
 from .models import (
     Athlete,
     AthleteSeason,
     ContactResponse,
     Event,
+    EventAlias,
+    ImportBatch,
+    Job,
+    RegisteredAthlete,
     Score,
     Season,
     Submission,
@@ -27,15 +32,20 @@ class AthleteAdmin(admin.ModelAdmin):
     search_fields = ["forename", "surname", "agb_number"]
 
 
+class EventAliasInline(admin.TabularInline):
+    model = EventAlias
+    extra = 0
+
+
 @admin.register(Event)
 class EventAdmin(DjangoObjectActions, admin.ModelAdmin):
     list_display = ["name", "identifier", "date", "round_family"]
     list_filter = ["date", "round_family"]
     search_fields = ["name"]
-    change_actions = ["import_scores"]
+    inlines = [EventAliasInline]
+    change_actions = ["import_scores", "upload_results", "import_results_file"]
 
     @action(label="Import scores", description="Import scores from AGB extranet")
-    @transaction.atomic
     def import_scores(self, request, obj):
         if not obj.extranet_id:
             self.message_user(
@@ -45,178 +55,137 @@ class EventAdmin(DjangoObjectActions, admin.ModelAdmin):
             )
             return
 
-        try:
-            response = requests.get(
-                "https://records.agbextranet.org.uk/Public/ShootReturn.php",
-                params={"SHOOTCODE": obj.extranet_id},
-            )
-        except:
-            self.message_user(
-                request,
-                "Cannot import scores: Something went wrong accessing the Extranet API",
-                messages.ERROR,
-            )
-            return
-
-        data = response.json()["value"]
-        if not len(data):
-            self.message_user(
-                request,
-                "Cannot import scores: No scores received from API",
-                messages.ERROR,
-            )
-            return
-
-        if Score.objects.filter(event=obj).exists():
-            self.message_user(
-                request,
-                "Cannot import scores: Already have scores for this event.",
-                messages.ERROR,
-            )
-            return
-
-        total_created = 0
-        season = Season.objects.get(year=obj.date.year)
-
-        for record in data:
-            if record["Score"] == "0":
-                # Skip athletes with a score of 0 as DNS
-                continue
-            if record["AthID"] == "0":
-                # Skip athletes with a missing AGB Number
-                continue
-            if not (
-                record["Category"].endswith("M") or record["Category"].endswith("W")
-            ):
-                # Skip records with e.g. RMLD?
-                continue
-
-            athlete_data = {}
-            athlete_data["agb_number"] = record["AthID"]
-            athlete_data["gender"] = DbGender.__lookup__[record["Category"][-1]]
-            athlete_data["bowstyle"] = DbBowstyles.__lookup__[record["Category"][0]]
-            athlete_data["score"] = record["Score"]
+        job = enqueue("import_event", event_id=obj.pk)
+        self.message_user(
+            request,
+            "Import queued as job %s, progress is shown under Jobs" % job.pk,
+            messages.SUCCESS,
+        )
 
+    @action(label="Upload results", description="Import scores from a CSV file")
+    def upload_results(self, request, obj):
+        return redirect("admin:junior_rankings_event_upload", obj.pk)
+
+    @action(
+        label="Import results file",
+        description="Import a tournament software export",
+    )
+    def import_results_file(self, request, obj):
+        return redirect("admin:junior_rankings_event_results_file", obj.pk)
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:event_id>/results-file/",
+                self.admin_site.admin_view(self.results_file_view),
+                name="junior_rankings_event_results_file",
+            ),
+            path(
+                "<int:event_id>/upload/",
+                self.admin_site.admin_view(self.upload_view),
+                name="junior_rankings_event_upload",
+            ),
+            path(
+                "upload/<int:batch_id>/",
+                self.admin_site.admin_view(self.confirm_upload_view),
+                name="junior_rankings_event_confirm_upload",
+            ),
+        ] + super().get_urls()
+
+    def upload_view(self, request, event_id):
+        event = get_object_or_404(Event, pk=event_id)
+        if not self.has_change_permission(request, event):
+            raise PermissionDenied
+
+        form = ImportUploadForm(request.POST or None, request.FILES or None)
+        status = 200
+        if form.is_valid():
             try:
-                athlete = Athlete.objects.get(agb_number=athlete_data["agb_number"])
-            except Athlete.DoesNotExist:
-                response = requests.get(
-                    "https://records.agbextranet.org.uk/Public/AGBLookup.php",
-                    params={"agbno": athlete_data["agb_number"]},
-                    headers={"Authorization": "Bearer %s" % settings.AGB_API_TOKEN},
-                )
-                api_athlete = response.json()["results"][0]
-                athlete_data["forename"] = api_athlete["full_name"].split(" ", 1)[0]
-                athlete_data["surname"] = api_athlete["full_name"].split(" ", 1)[1]
-                athlete_data["year"] = int(api_athlete["YOB"])
-
-                athlete = Athlete(
-                    agb_number=athlete_data["agb_number"],
-                    forename=athlete_data["forename"],
-                    surname=athlete_data["surname"],
-                    year=athlete_data["year"],
-                    gender=athlete_data["gender"],
-                )
-
-            athlete_data["age_group"] = get_age_group(athlete.year, obj.date.year)
-            if athlete_data["age_group"] in [
-                DbAges.AGE_UNDER_21,
-                DbAges.AGE_UNDER_18,
-                DbAges.AGE_UNDER_16,
-                DbAges.AGE_UNDER_15,
-                DbAges.AGE_UNDER_14,
-                DbAges.AGE_UNDER_12,
-            ]:
-                athlete.save()
+                batch = staging.stage_csv(event, form.cleaned_data["file"])
+            except staging.StagingError as e:
+                form.add_error("file", e.errors)
+                status = 400
+            except UnicodeDecodeError as e:
+                form.add_error("file", str(e))
+                status = 400
             else:
-                # Skip any adult scores
-                continue
+                return redirect("admin:junior_rankings_event_confirm_upload", batch.pk)
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "original": event,
+            "title": "Upload results for %s" % event,
+            "form": form,
+        }
+        return TemplateResponse(
+            request, "admin/junior_rankings/event/upload.html", context, status=status
+        )
 
-            try:
-                athlete_season = AthleteSeason.objects.get(
-                    athlete=athlete,
-                    season=season,
-                    bowstyle=athlete_data["bowstyle"],
-                )
-            except AthleteSeason.DoesNotExist:
-                athlete_season = AthleteSeason.objects.create(
-                    athlete=athlete,
-                    season=season,
-                    age_group=athlete_data["age_group"],
-                    bowstyle=athlete_data["bowstyle"],
-                )
+    def results_file_view(self, request, event_id):
+        event = get_object_or_404(Event, pk=event_id)
+        if not self.has_change_permission(request, event):
+            raise PermissionDenied
 
-            competed_age_group = record["Category"][1:-1]
+        form = ResultsFileForm(request.POST or None, request.FILES or None)
+        report = None
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
             try:
-                athlete_data["competed_age_group"] = DbAges.__lookup__[
-                    competed_age_group
-                ]
-            except KeyError:
-                athlete_data["competed_age_group"] = DbAges.AGE_UNDER_21
-
-            if not obj.round_age_rules:
-                athlete_data["shot_round"] = get_allowed_rounds(
-                    family=obj.round_family,
-                    gender=athlete_data["gender"],
-                    age_group=athlete_data["competed_age_group"],
-                    bowstyle=athlete_data["bowstyle"],
-                )[0]
-            elif obj.round_age_rules == "jas":
-                shot_round = {
-                    "BY": "wa720_50_b",
-                    "CY": "wa720_50_c",
-                    "RU15": "metric_122_40",
-                    "RU18": "wa720_60",
-                    "RU21": "wa720_70",
-                }[record["Category"][:-1]]
-                athlete_data["shot_round"] = all_rounds[shot_round]
-            elif obj.round_age_rules == "nt":
-                shot_round = {
-                    "B": "wa720_50_b",
-                    "C": "wa720_50_c",
-                    "R": "wa720_70",
-                    "L": "wa720_70",
-                }[record["Category"][0]]
-                athlete_data["shot_round"] = all_rounds[shot_round]
-            elif obj.round_age_rules == "nt-1440":
-                shot_round = {
-                    "M": "wa1440_90",
-                    "W": "wa1440_70",
-                }[record["Category"][-1]]
-                athlete_data["shot_round"] = all_rounds[shot_round]
-
-            # For now, remove duplicates. When the double rounds work, this will need some conditions!
-
-            if Score.objects.filter(
-                athlete_season=athlete_season,
-                event=obj,
-            ).exists():
-                continue
-            if "Score1" in record:
-                Score.objects.create(
-                    athlete_season=athlete_season,
-                    event=obj,
-                    shot_round=athlete_data["shot_round"],
-                    score=record["Score1"],
-                )
-                Score.objects.create(
-                    athlete_season=athlete_season,
-                    event=obj,
-                    shot_round=athlete_data["shot_round"],
-                    score=record["Score2"],
-                )
-            else:
-                Score.objects.create(
-                    athlete_season=athlete_season,
-                    event=obj,
-                    shot_round=athlete_data["shot_round"],
-                    score=athlete_data["score"],
+                report = results_files.import_results_file(
+                    event, upload, upload.name, dry_run=form.cleaned_data["dry_run"]
                 )
+            except results_files.ResultsFileError as e:
+                form.add_error("file", str(e))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "original": event,
+            "title": "Import results file for %s" % event,
+            "form": form,
+            "report": report,
+        }
+        return TemplateResponse(
+            request, "admin/junior_rankings/event/results_file.html", context
+        )
 
-            total_created += 1
+    def confirm_upload_view(self, request, batch_id):
+        batch = get_object_or_404(ImportBatch, pk=batch_id, committed__isnull=True)
+        if not self.has_change_permission(request, batch.event):
+            raise PermissionDenied
 
-        self.message_user(
-            request, "%s new scores imported" % total_created, messages.SUCCESS
+        page = Paginator(staging.unknown_athletes(batch), 50).get_page(
+            request.GET.get("page")
+        )
+        form = UnknownAthletesForm(list(page), request.POST or None)
+        if form.is_valid():
+            staging.set_years(batch, form.years())
+            if "commit" in request.POST:
+                # Athletes without a year are looked up, which is too slow
+                # for a request
+                job = enqueue_once("commit_import_batch", batch_id=batch.pk)
+                self.message_user(
+                    request,
+                    "Import queued as job %s, progress is shown under Jobs" % job.pk,
+                    messages.SUCCESS,
+                )
+                return redirect("admin:junior_rankings_event_change", batch.event.pk)
+            self.message_user(request, "Years of birth saved", messages.SUCCESS)
+            url = reverse("admin:junior_rankings_event_confirm_upload", args=[batch.pk])
+            return redirect("%s?page=%s" % (url, page.number))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "original": batch.event,
+            "title": "Check new athletes in %s" % batch.filename,
+            "batch": batch,
+            "page": page,
+            "form": form,
+        }
+        return TemplateResponse(
+            request, "admin/junior_rankings/event/confirm_upload.html", context
         )
 
 
@@ -257,5 +226,58 @@ class SubmissionAdmin(admin.ModelAdmin):
     readonly_fields = ["processed"]
 
 
+@admin.register(RegisteredAthlete)
+class RegisteredAthleteAdmin(admin.ModelAdmin):
+    list_display = ["agb_number", "fetched"]
+    search_fields = ["agb_number"]
+    readonly_fields = ["fetched"]
+
+
+@admin.register(Job)
+class JobAdmin(DjangoObjectActions, admin.ModelAdmin):
+    list_display = ["kind", "status", "progress_display", "created", "finished"]
+    list_filter = ["status", "kind"]
+    readonly_fields = [
+        "kind",
+        "params",
+        "status",
+        "progress_display",
+        "message",
+        "worker",
+        "created",
+        "started",
+        "heartbeat",
+        "attempts",
+        "finished",
+    ]
+    exclude = ["progress", "total"]
+    changelist_actions = ["queue_update_handicaps", "queue_rerank"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Progress")
+    def progress_display(self, obj):
+        if obj.total:
+            return "%s / %s" % (obj.progress, obj.total)
+        return "-"
+
+    @action(label="Update handicaps", description="Recalculate aggregate handicaps")
+    def queue_update_handicaps(self, request, queryset):
+        job = enqueue("update_handicaps")
+        self.message_user(request, "Queued job %s" % job.pk, messages.SUCCESS)
+
+    @action(label="Rerank", description="Recalculate every rank")
+    def queue_rerank(self, request, queryset):
+        job = enqueue("rerank")
+        self.message_user(request, "Queued job %s" % job.pk, messages.SUCCESS)
+
+
+@admin.register(ImportBatch)
+class ImportBatchAdmin(admin.ModelAdmin):
+    list_display = ["filename", "event", "rows", "created", "committed"]
+    readonly_fields = ["event", "filename", "rows", "created", "committed"]
+
+
 admin.site.register(Season)
 admin.site.register(SubmissionScore)
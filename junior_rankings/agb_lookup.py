@@ -0,0 +1,145 @@
+import concurrent.futures
+import threading
+import time
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class AthleteLookupError(Exception):
+    pass
+
+
+class CircuitOpenError(AthleteLookupError):
+    pass
+
+
+class CircuitBreaker(object):
+    """Stop calling the extranet for a while after repeated failures.
+
+    Once ``reset_after`` seconds have passed a single call is let through,
+    and the circuit closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_after=30):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_after:
+                raise CircuitOpenError("AGB lookups are failing, not trying again yet")
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# Shared by every client in the process, so when one import finds the
+# extranet failing the next doesn't start calling it again straight away.
+circuit_breaker = CircuitBreaker()
+
+
+class AthleteLookupClient(object):
+    """Look up athletes by AGB number, many at a time.
+
+    Requests share one keep-alive connection pool, and each has a timeout and
+    is retried with backoff on connection errors and server errors.
+    """
+
+    def __init__(
+        self,
+        url=None,
+        token=None,
+        workers=None,
+        timeout=None,
+        retries=3,
+        backoff_factor=0.5,
+        breaker=None,
+    ):
+        self.url = url or settings.AGB_LOOKUP_URL
+        self.workers = workers or settings.AGB_LOOKUP_WORKERS
+        self.timeout = timeout or settings.AGB_LOOKUP_TIMEOUT
+        self.breaker = breaker or circuit_breaker
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_maxsize=self.workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Authorization"] = "Bearer %s" % (
+            token if token is not None else settings.AGB_API_TOKEN
+        )
+
+    def lookup(self, agb_number):
+        """Return the raw lookup result for an AGB number, or None if unknown."""
+        self.breaker.check()
+        try:
+            response = self.session.get(
+                self.url, params={"agbno": agb_number}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json()["results"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            self.breaker.record_failure()
+            raise AthleteLookupError(
+                "Looking up AGB number %s failed: %s" % (agb_number, e)
+            ) from e
+        self.breaker.record_success()
+        return results[0] if results else None
+
+    def lookup_many(self, agb_numbers):
+        """Look up AGB numbers concurrently.
+
+        Returns a dict of raw results, and a dict of the AthleteLookupError for
+        each AGB number whose lookup failed, which is left out of the results.
+        """
+        results = {}
+        errors = {}
+        agb_numbers = sorted(set(agb_numbers))
+        if not agb_numbers:
+            return results, errors
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.workers, len(agb_numbers))
+        ) as executor:
+            futures = {
+                executor.submit(self.lookup, agb_number): agb_number
+                for agb_number in agb_numbers
+            }
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except AthleteLookupError as e:
+                    errors[futures[future]] = e
+        return results, errors
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
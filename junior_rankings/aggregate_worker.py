@@ -0,0 +1,18 @@
+"""Process pool tasks for update_agg_handicaps_parallel.
+
+Workers import this module before Django is set up, so it must not import
+models at the top level.
+"""
+
+import django
+
+
+def setup():
+    django.setup()
+
+
+def update_chunk(athlete_season_ids):
+    from .aggregates import update_agg_handicaps
+    from .models import AthleteSeason
+
+    return update_agg_handicaps(AthleteSeason.objects.filter(pk__in=athlete_season_ids))
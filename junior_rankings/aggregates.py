@@ -0,0 +1,88 @@
+import concurrent.futures
+import itertools
+
+from django.db import connections, transaction
+
+import numpy as np
+
+from . import aggregate_worker
+from .models import AthleteSeason, Score
+
+# Number of scores which count towards the aggregate handicap
+COUNTING_SCORES = 3
+
+
+def aggregate_handicaps(athlete_season_ids, handicaps):
+    """Sum the best counting handicaps for each athlete season.
+
+    Returns a dict of athlete season id to aggregate handicap, for every
+    athlete season with enough valid scores.
+    """
+    valid = ~np.isnan(handicaps)
+    athlete_season_ids = athlete_season_ids[valid]
+    handicaps = handicaps[valid]
+    if not len(handicaps):
+        return {}
+
+    order = np.lexsort((handicaps, athlete_season_ids))
+    athlete_season_ids = athlete_season_ids[order]
+    handicaps = handicaps[order]
+
+    groups, starts, counts = np.unique(
+        athlete_season_ids, return_index=True, return_counts=True
+    )
+    position = np.arange(len(handicaps)) - np.repeat(starts, counts)
+    counting = position < COUNTING_SCORES
+    totals = np.bincount(
+        np.repeat(np.arange(len(groups)), counts)[counting],
+        weights=handicaps[counting],
+        minlength=len(groups),
+    )
+    ranked = counts >= COUNTING_SCORES
+    return dict(zip(groups[ranked].tolist(), totals[ranked].astype(int).tolist()))
+
+
+def load_handicaps(athlete_seasons):
+    """The stored handicap of every valid score, with its athlete season."""
+    rows = (
+        Score.objects.filter(athlete_season__in=athlete_seasons, handicap__isnull=False)
+        .order_by("athlete_season_id")
+        .values_list("athlete_season_id", "handicap")
+    )
+    ids, handicaps = [], []
+    for athlete_season_id, handicap in rows.iterator(chunk_size=5000):
+        ids.append(athlete_season_id)
+        handicaps.append(handicap)
+    return np.array(ids, dtype=np.int64), np.array(handicaps, dtype=float)
+
+
+def update_agg_handicaps(athlete_seasons, batch_size=1000):
+    """Recalculate and store the aggregate handicap for the given athlete seasons.
+
+    Returns the number of athlete seasons updated and the number of scores read.
+    """
+    athlete_seasons = athlete_seasons.values("pk")
+    ids, handicaps = load_handicaps(athlete_seasons)
+    aggregates = aggregate_handicaps(ids, handicaps)
+    seasons = [
+        AthleteSeason(pk=pk, agg_handicap=aggregates.get(pk))
+        for pk in athlete_seasons.values_list("pk", flat=True)
+    ]
+    with transaction.atomic():
+        AthleteSeason.objects.bulk_update(
+            seasons, ["agg_handicap"], batch_size=batch_size
+        )
+    return len(seasons), len(handicaps)
+
+
+def update_agg_handicaps_parallel(athlete_seasons, workers, chunk_size=2000):
+    """Split the update across a process pool, one chunk of seasons per task."""
+    athlete_season_ids = list(athlete_seasons.values_list("pk", flat=True))
+    chunks = itertools.batched(athlete_season_ids, chunk_size)
+    # Worker processes must open their own database connections
+    connections.close_all()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=aggregate_worker.setup
+    ) as executor:
+        results = list(executor.map(aggregate_worker.update_chunk, chunks))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
@@ -1,3 +1,5 @@
+import itertools
+
 from archeryutils import load_rounds
 
 from archerydjango.fields import DbAges, DbBowstyles, DbGender
@@ -25,9 +27,29 @@ all_available_rounds = {
 }
 
 
-def get_allowed_rounds(family, gender, age_group, bowstyle):
+# The WA rounds are shot under the same distance rules as the AGB family
+# they belong with.
+family_rules = {
+    "wa720": "metric720",
+    "wa1440": "metric1440",
+    "wa900": "agb900",
+}
+
+junior_age_groups = [
+    DbAges.AGE_UNDER_21,
+    DbAges.AGE_UNDER_18,
+    DbAges.AGE_UNDER_16,
+    DbAges.AGE_UNDER_15,
+    DbAges.AGE_UNDER_14,
+    DbAges.AGE_UNDER_12,
+]
+
+
+def calculate_allowed_rounds(family, gender, age_group, bowstyle):
+    """Work out the allowed rounds from scratch, see get_allowed_rounds."""
     if family not in allowed_families:
         return []
+    family = family_rules.get(family, family)
     if family in ["stgeorge_albion_windsor", "york_hereford_bristol"]:
         imperial_required_distances = {
             (DbGender.MALE, DbAges.AGE_UNDER_12): 30,
@@ -145,3 +167,23 @@ def get_allowed_rounds(family, gender, age_group, bowstyle):
                 rounds.append(r)
     rounds.reverse()
     return rounds
+
+
+def build_allowed_rounds_index():
+    return {
+        key: tuple(calculate_allowed_rounds(*key))
+        for key in itertools.product(
+            allowed_families, DbGender, junior_age_groups, DbBowstyles
+        )
+    }
+
+
+allowed_rounds_index = build_allowed_rounds_index()
+
+
+def get_allowed_rounds(family, gender, age_group, bowstyle):
+    """Rounds of the family which an athlete may shoot for the rankings.
+
+    Served from an index built at import, so it is cheap to call per event.
+    """
+    return list(allowed_rounds_index.get((family, gender, age_group, bowstyle), ()))
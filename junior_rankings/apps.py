@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class JuniorRankingsConfig(AppConfig):
     name = "junior_rankings"
     verbose_name = "Junior Rankings"
+
+    def ready(self):
+        # Connect signal handlers
+        from . import freshness, maintenance  # noqa: F401
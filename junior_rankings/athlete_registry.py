@@ -0,0 +1,69 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .agb_lookup import AthleteLookupClient
+from .models import RegisteredAthlete
+
+
+def athlete_details(api_athlete):
+    """Name and year of birth from an AGB lookup result, in either shape."""
+    if "full_name" in api_athlete:
+        forename, surname = api_athlete["full_name"].split(" ", 1)
+    else:
+        forename, surname = api_athlete["Firstname"], api_athlete["Lastname"]
+    return {"forename": forename, "surname": surname, "year": int(api_athlete["YOB"])}
+
+
+def stale_before():
+    return timezone.now() - datetime.timedelta(seconds=settings.AGB_REGISTRY_TTL)
+
+
+def refresh(agb_numbers, client=None):
+    """Look up AGB numbers and store the results.
+
+    Returns the results, and the errors for any lookups which failed, as
+    returned by AthleteLookupClient.lookup_many.
+    """
+    agb_numbers = set(agb_numbers)
+    if not agb_numbers:
+        return {}, {}
+    if client is None:
+        with AthleteLookupClient() as client:
+            return refresh(agb_numbers, client)
+    results, errors = client.lookup_many(agb_numbers)
+    now = timezone.now()
+    RegisteredAthlete.objects.bulk_create(
+        [
+            RegisteredAthlete(agb_number=agb_number, data=data, fetched=now)
+            for agb_number, data in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["agb_number"],
+        update_fields=["data", "fetched"],
+    )
+    return results, errors
+
+
+def get_athlete_details(agb_numbers, client=None, lookup=True):
+    """Athlete details for AGB numbers, from the registry where it is fresh.
+
+    Returns a dict of AGB number to details, or None if the extranet doesn't
+    know the number. Only numbers missing or stale in the registry are looked
+    up, or none without ``lookup``, and numbers whose lookups fail are left
+    out.
+    """
+    agb_numbers = set(agb_numbers)
+    results = dict(
+        RegisteredAthlete.objects.filter(
+            agb_number__in=agb_numbers, fetched__gte=stale_before()
+        ).values_list("agb_number", "data")
+    )
+    if lookup:
+        refreshed, errors = refresh(agb_numbers - set(results), client)
+        results.update(refreshed)
+    return {
+        agb_number: athlete_details(data) if data else None
+        for agb_number, data in results.items()
+    }
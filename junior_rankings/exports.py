@@ -0,0 +1,89 @@
+import csv
+
+from django.db.models import Prefetch
+
+from .aggregates import COUNTING_SCORES
+from .models import AthleteSeason, Score
+
+HEADER = [
+    "Season",
+    "Division",
+    "Gender",
+    "Age group",
+    "Rank",
+    "Age group rank",
+    "Archery GB Number",
+    "Forename",
+    "Surname",
+    "Year of Birth",
+    "Aggregate handicap",
+]
+for number in range(1, COUNTING_SCORES + 1):
+    HEADER += [
+        "Score %s event" % number,
+        "Score %s date" % number,
+        "Score %s round" % number,
+        "Score %s" % number,
+        "Score %s handicap" % number,
+    ]
+
+
+class Echo(object):
+    """File-like object which hands back what is written, for streaming CSV."""
+
+    def write(self, value):
+        return value
+
+
+def ranking_rows(seasons=None, chunk_size=500):
+    """Yield the header then one row per ranked athlete, with counting scores.
+
+    Athlete seasons are read from a server-side cursor, with the counting
+    scores prefetched a chunk at a time, so memory use does not grow with the
+    number of rows.
+    """
+    if seasons is None:
+        seasons = AthleteSeason.objects.all()
+    counting_scores = Score.objects.select_related("event").order_by(
+        "handicap", "-score"
+    )[:COUNTING_SCORES]
+    seasons = (
+        seasons.filter(overall_rank__isnull=False)
+        .select_related("season", "athlete")
+        .prefetch_related(
+            Prefetch("score_set", queryset=counting_scores, to_attr="counting_scores")
+        )
+        .order_by("season__year", "bowstyle", "athlete__gender", "overall_rank", "id")
+    )
+
+    yield HEADER
+    for season in seasons.iterator(chunk_size=chunk_size):
+        athlete = season.athlete
+        row = [
+            season.season.year,
+            season.bowstyle.label,
+            athlete.gender.label,
+            season.age_group.label,
+            season.overall_rank_display,
+            season.age_group_rank_display,
+            athlete.agb_number,
+            athlete.forename,
+            athlete.surname,
+            athlete.year,
+            season.agg_handicap,
+        ]
+        for score in season.counting_scores:
+            row += [
+                score.event.name,
+                score.event.date,
+                score.shot_round.name,
+                score.score,
+                score.handicap,
+            ]
+        yield row
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
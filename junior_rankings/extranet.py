@@ -0,0 +1,261 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+import requests
+
+from archerydjango.fields import DbAges, DbBowstyles, DbGender
+from archerydjango.utils import get_age_group
+
+from .allowed_rounds import all_rounds, get_allowed_rounds, junior_age_groups
+from .athlete_registry import get_athlete_details
+from .models import Athlete, AthleteSeason, Score, Season
+
+
+def fetch_shoot_return(extranet_id, session=None):
+    response = (session or requests).get(
+        settings.EXTRANET_SHOOT_RETURN_URL,
+        params={"SHOOTCODE": extranet_id},
+        timeout=settings.AGB_LOOKUP_TIMEOUT,
+    )
+    return response.json()["value"]
+
+
+def parse_category(category):
+    """Gender, bowstyle and age group from an extranet category, e.g. RU18W."""
+    if not (category.endswith("M") or category.endswith("W")):
+        # Skip records with e.g. RMLD?
+        return None
+    return {
+        "category": category,
+        "gender": DbGender.__lookup__[category[-1]],
+        "bowstyle": DbBowstyles.__lookup__[category[0]],
+        "competed_age_group": DbAges.__lookup__.get(
+            category[1:-1], DbAges.AGE_UNDER_21
+        ),
+    }
+
+
+def parse_shoot_return(data):
+    """Turn extranet shoot return records into entries to import."""
+    entries = []
+    for record in data:
+        if record["Score"] == "0":
+            # Skip athletes with a score of 0 as DNS
+            continue
+        if record["AthID"] == "0":
+            # Skip athletes with a missing AGB Number
+            continue
+        entry = parse_category(record["Category"])
+        if entry is None:
+            continue
+
+        if "Score1" in record:
+            entry["scores"] = [int(record["Score1"]), int(record["Score2"])]
+        else:
+            entry["scores"] = [int(record["Score"])]
+        entry["agb_number"] = record["AthID"]
+        entries.append(entry)
+    return entries
+
+
+def shot_round(event, entry):
+    category = entry["category"]
+    if not event.round_age_rules:
+        return get_allowed_rounds(
+            family=event.round_family,
+            gender=entry["gender"],
+            age_group=entry["competed_age_group"],
+            bowstyle=entry["bowstyle"],
+        )[0]
+    elif event.round_age_rules == "jas":
+        codename = {
+            "BY": "wa720_50_b",
+            "CY": "wa720_50_c",
+            "RU15": "metric_122_40",
+            "RU18": "wa720_60",
+            "RU21": "wa720_70",
+        }[category[:-1]]
+    elif event.round_age_rules == "nt":
+        codename = {
+            "B": "wa720_50_b",
+            "C": "wa720_50_c",
+            "R": "wa720_70",
+            "L": "wa720_70",
+        }[category[0]]
+    elif event.round_age_rules == "nt-1440":
+        codename = {
+            "M": "wa1440_90",
+            "W": "wa1440_70",
+        }[category[-1]]
+    return all_rounds[codename]
+
+
+def import_event_scores(event, entries, client=None):
+    """Load parsed entries for an event, returning the number of new scores."""
+    return import_scores([(event, entries)], client)[event.pk]
+
+
+def import_scores(
+    event_entries, client=None, update=False, details=None, lookup=True, skipped=None
+):
+    """Load parsed entries for any number of events, in a fixed number of queries.
+
+    ``event_entries`` is a list of (event, entries) pairs, with entries as
+    made by parse_shoot_return. Entries can also give their ``shot_round``
+    and first ``round_number``. Athletes missing from the database are read
+    from ``details``, a dict of AGB number to name and year of birth, or
+    else from the athlete registry, which looks up any it doesn't have with
+    ``client`` unless ``lookup`` is false. Athletes who can't be found are
+    skipped. Scores already held for an event are left alone, so events can
+    be imported again to pick up late results, or with ``update`` their
+    scores are replaced, to pick up corrections. Everything is written in one
+    transaction, so aggregates and ranks are recalculated once at the end.
+
+    Entries which aren't imported are counted by reason in ``skipped``, if a
+    Counter is given.
+
+    Returns a dict of event id to the number of scores created.
+    """
+    if skipped is None:
+        skipped = Counter()
+    agb_numbers = {
+        entry["agb_number"] for event, entries in event_entries for entry in entries
+    }
+    athletes = {}
+    for athlete in Athlete.objects.filter(agb_number__in=agb_numbers).order_by("-pk"):
+        athletes[athlete.agb_number] = athlete
+
+    # Looked up before the transaction starts, so it isn't held open
+    given = details or {}
+    details = get_athlete_details(
+        agb_numbers - set(athletes) - set(given), client, lookup=lookup
+    )
+    details.update(given)
+
+    # Only athletes with scores to import are saved, by _write_entries
+    new_athletes = {}
+    for event, entries in event_entries:
+        for entry in entries:
+            agb_number = entry["agb_number"]
+            if agb_number in athletes or agb_number in new_athletes:
+                continue
+            if details.get(agb_number) is None:
+                if agb_number in details:
+                    skipped["athlete not found"] += 1
+                elif lookup:
+                    skipped["athlete lookup failed"] += 1
+                else:
+                    skipped["athlete not looked up"] += 1
+                continue
+            new_athletes[agb_number] = Athlete(
+                agb_number=agb_number, gender=entry["gender"], **details[agb_number]
+            )
+    return _write_entries(event_entries, athletes, new_athletes, update, skipped)
+
+
+@transaction.atomic
+def _write_entries(event_entries, athletes, new_athletes, update, skipped):
+    athletes = {**athletes, **new_athletes}
+    events = [event for event, entries in event_entries]
+    seasons = {
+        season.year: season
+        for season in Season.objects.filter(
+            year__in={event.date.year for event in events}
+        )
+    }
+    # Keyed by AGB number, as new athletes aren't saved yet
+    athlete_seasons = {
+        (s.athlete.agb_number, s.season_id, s.bowstyle): s
+        for s in AthleteSeason.objects.filter(
+            season__in=seasons.values(),
+            athlete__in=[athlete for athlete in athletes.values() if athlete.pk],
+        ).select_related("athlete")
+    }
+    new_athlete_seasons = {}
+    scores = []
+    for event, entries in event_entries:
+        if event.date.year not in seasons:
+            raise Season.DoesNotExist("No season for %s" % event.date.year)
+        season = seasons[event.date.year]
+        for entry in entries:
+            athlete = athletes.get(entry["agb_number"])
+            if athlete is None:
+                continue
+            age_group = get_age_group(athlete.year, event.date.year)
+            if age_group not in junior_age_groups:
+                # Skip any adult scores
+                skipped["adult"] += 1
+                continue
+
+            if "shot_round" in entry:
+                # Results which name the round are checked against the rounds
+                # the athlete may shoot, before anything is created for them.
+                rnd = entry["shot_round"]
+                allowed_rounds = get_allowed_rounds(
+                    family=event.round_family,
+                    gender=athlete.gender,
+                    age_group=age_group,
+                    bowstyle=entry["bowstyle"],
+                )
+                if rnd not in allowed_rounds:
+                    skipped["round not allowed"] += 1
+                    continue
+            else:
+                rnd = shot_round(event, entry)
+
+            key = (athlete.agb_number, season.pk, entry["bowstyle"])
+            athlete_season = athlete_seasons.get(key) or new_athlete_seasons.get(key)
+            if athlete_season is None:
+                athlete_season = new_athlete_seasons[key] = AthleteSeason(
+                    athlete=athlete,
+                    season=season,
+                    age_group=age_group,
+                    bowstyle=entry["bowstyle"],
+                )
+            first_round = entry.get("round_number", 1)
+            for round_number, score in enumerate(entry["scores"], first_round):
+                scores.append(
+                    Score(
+                        athlete_season=athlete_season,
+                        event=event,
+                        shot_round=rnd,
+                        score=score,
+                        round_number=round_number,
+                    )
+                )
+    # Only athletes with a score to import are created
+    Athlete.objects.bulk_create(
+        {
+            athlete_season.athlete.agb_number: athlete_season.athlete
+            for athlete_season in new_athlete_seasons.values()
+            if athlete_season.athlete.pk is None
+        }.values()
+    )
+    AthleteSeason.objects.bulk_create(new_athlete_seasons.values())
+
+    existing = score_counts(events)
+    if update:
+        Score.objects.bulk_create(
+            scores,
+            update_conflicts=True,
+            unique_fields=["athlete_season", "event", "round_number"],
+            update_fields=["shot_round", "score", "handicap"],
+        )
+    else:
+        Score.objects.bulk_create(scores, ignore_conflicts=True)
+    created = score_counts(events)
+    return {event.pk: created[event.pk] - existing[event.pk] for event in events}
+
+
+def score_counts(events):
+    counts = dict.fromkeys([event.pk for event in events], 0)
+    counts.update(
+        Score.objects.filter(event__in=events)
+        .values_list("event")
+        .annotate(Count("pk"))
+        .order_by()
+    )
+    return counts
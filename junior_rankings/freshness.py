@@ -0,0 +1,150 @@
+import functools
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import (
+    add_never_cache_headers,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.views.decorators.http import condition
+
+from .models import Athlete, AthleteSeason, Event, LastModified
+from .ranking_cache import bump_generation
+
+ATHLETES = "athletes"
+EVENTS = "events"
+RANKINGS = "rankings"
+SCORES = "scores"
+
+
+# Names touched in this thread's transaction, written when it commits
+_touched = threading.local()
+
+
+def cache_key(name):
+    return "freshness:%s" % name
+
+
+def touch(*names):
+    """Record that the named data has changed.
+
+    Names are collected and written once the transaction commits, not for
+    every row saved. Names touched in a transaction which rolls back are
+    written with the next one, which only costs a revalidation. The time is
+    also kept in the cache, and touching RANKINGS starts a new ranking cache
+    generation, so requests can check both without queries.
+    """
+    if not hasattr(_touched, "names"):
+        _touched.names = set()
+    _touched.names.update(names)
+    transaction.on_commit(write_touched)
+
+
+def write_touched():
+    names = getattr(_touched, "names", set())
+    _touched.names = set()
+    if not names:
+        return
+    now = timezone.now()
+    LastModified.objects.bulk_create(
+        [LastModified(name=name, timestamp=now) for name in names],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["timestamp"],
+    )
+    cache.set_many({cache_key(name): now for name in names}, timeout=None)
+    if RANKINGS in names:
+        bump_generation()
+
+
+def last_modified(*names):
+    """When any of the named data last changed, from the cache where possible."""
+    cached = cache.get_many([cache_key(name) for name in names])
+    missing = [name for name in names if cache_key(name) not in cached]
+    if missing:
+        stored = dict(
+            LastModified.objects.filter(name__in=missing).values_list(
+                "name", "timestamp"
+            )
+        )
+        for name in missing:
+            # "" for never, and left alone if touch() has set it meanwhile
+            timestamp = stored.get(name, "")
+            if not cache.add(cache_key(name), timestamp, timeout=None):
+                timestamp = cache.get(cache_key(name), timestamp)
+            cached[cache_key(name)] = timestamp
+    timestamps = [timestamp for timestamp in cached.values() if timestamp]
+    return max(timestamps, default=None)
+
+
+def conditional(*names, params=(), max_age=None, per_user=False):
+    """Answer conditional GETs from when the named data last changed.
+
+    The ETag also covers the listed query parameters, as they select what the
+    response contains. Successful responses may be cached publicly for
+    ``max_age``, and errors aren't cached at all. If responses depend on who
+    is logged in, pass ``per_user``: they then vary on the cookie, and are
+    only cached privately for logged in users.
+    """
+    if max_age is None:
+        max_age = settings.HTTP_CACHE_MAX_AGE
+
+    def get_last_modified(request, *args, **kwargs):
+        if not hasattr(request, "_last_modified"):
+            request._last_modified = {}
+        if names not in request._last_modified:
+            request._last_modified[names] = last_modified(*names)
+        return request._last_modified[names]
+
+    def get_etag(request, *args, **kwargs):
+        timestamp = get_last_modified(request)
+        if timestamp is None:
+            return None
+        parts = [settings.SOURCE_VERSION, timestamp.isoformat(), request.path]
+        parts += [request.GET.get(param, "") for param in params]
+        if per_user:
+            parts.append(str(request.user.pk or ""))
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def decorator(view):
+        view = condition(etag_func=get_etag, last_modified_func=get_last_modified)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                # Errors mustn't be reused by browsers or a CDN
+                add_never_cache_headers(response)
+                return response
+            if per_user:
+                patch_vary_headers(response, ["Cookie"])
+                if request.user.is_authenticated:
+                    patch_cache_control(response, private=True, max_age=max_age)
+                    return response
+            patch_cache_control(response, public=True, max_age=max_age)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def touch_athletes(sender, **kwargs):
+    touch(ATHLETES)
+
+
+def touch_events(sender, **kwargs):
+    touch(EVENTS)
+
+
+for model in [Athlete, AthleteSeason]:
+    post_save.connect(touch_athletes, sender=model)
+    post_delete.connect(touch_athletes, sender=model)
+post_save.connect(touch_events, sender=Event)
+post_delete.connect(touch_events, sender=Event)
@@ -0,0 +1,94 @@
+import functools
+
+import numpy as np
+from archeryutils.handicaps import handicap_from_score, handicap_scheme
+from archeryutils.rounds import Round
+
+from .allowed_rounds import all_available_rounds
+
+HANDICAP_SYSTEM = "AGB"
+
+# Handicaps stepped through when inverting the score curve. Well past the
+# point where any of the allowed rounds scores less than a single point.
+MAX_TABLE_HANDICAP = 1000
+
+# Scores this close to the raw score at an integer handicap are sensitive to
+# the tolerance of the archeryutils root finder, so are solved exactly.
+EXACT_SOLVE_TOLERANCE = 0.25
+
+
+class HandicapTable(object):
+    """Integer AGB handicap for every possible score on a round.
+
+    Index ``n`` of ``handicaps`` holds the handicap for a score of ``n``. The
+    values match ``handicap_from_score(..., int_prec=True)`` exactly.
+    """
+
+    def __init__(self, rnd):
+        self.round = rnd
+        self.max_score = int(rnd.max_score())
+        self.handicaps = self._build()
+
+    def _build(self):
+        scheme = handicap_scheme(HANDICAP_SYSTEM)
+        grid = np.arange(
+            int(np.floor(scheme.scale_bounds.min())),
+            MAX_TABLE_HANDICAP,
+            dtype=np.float64,
+        )
+        raw = scheme.score_for_round(grid, self.round, rounded_score=False)
+        rounded = scheme._rounded_score(raw)
+        scores = np.arange(self.max_score + 1)
+
+        # Scores fall as the handicap rises, so search on the negated curves.
+        # first: the lowest handicap whose raw score is no more than the score.
+        # last: the highest handicap which still rounds up to the score.
+        first = np.searchsorted(-raw, -scores, side="left")
+        last = np.searchsorted(-rounded, -scores, side="right") - 1
+        handicaps = grid[np.minimum(np.maximum(first, last), len(grid) - 1)]
+
+        exact = first >= len(grid)
+        first = np.minimum(first, len(grid) - 1)
+        exact |= np.abs(raw[first] - scores) < EXACT_SOLVE_TOLERANCE
+        exact |= np.abs(raw[np.maximum(first - 1, 0)] - scores) < EXACT_SOLVE_TOLERANCE
+        exact[self.max_score] = True
+        exact[0] = False
+        for score in np.flatnonzero(exact):
+            handicaps[score] = handicap_from_score(
+                int(score), self.round, HANDICAP_SYSTEM, int_prec=True
+            )
+
+        table = handicaps.astype(np.int64)
+        # A score of zero has no handicap.
+        table[0] = -1
+        return table
+
+    def is_valid_score(self, score):
+        return 0 < score <= self.max_score
+
+    def handicap(self, score):
+        if not self.is_valid_score(score):
+            raise ValueError(
+                "Score of %s is not valid for a %s" % (score, self.round.name)
+            )
+        return int(self.handicaps[score])
+
+    def as_list(self):
+        """Handicaps indexed by score, with None for the invalid score of 0."""
+        return [None] + self.handicaps[1:].tolist()
+
+
+@functools.cache
+def _table_for_codename(codename):
+    return HandicapTable(all_available_rounds[codename])
+
+
+def get_handicap_table(rnd):
+    """Return the (cached) handicap table for a round or round codename."""
+    if isinstance(rnd, Round):
+        rnd = rnd.codename
+    return _table_for_codename(rnd)
+
+
+def handicap_for_score(score, rnd):
+    return get_handicap_table(rnd).handicap(score)
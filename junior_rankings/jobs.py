@@ -0,0 +1,227 @@
+import contextlib
+import datetime
+import itertools
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+import sentry_sdk
+
+from .aggregates import update_agg_handicaps
+from .extranet import fetch_shoot_return, import_event_scores, parse_shoot_return
+from .maintenance import refresh_athlete_seasons
+from .models import AthleteSeason, Event, ImportBatch, Job
+from .ranking import rerank
+from .snapshots import publish
+from .staging import commit
+
+handlers = {}
+
+
+def handler(kind):
+    """Register a function to run jobs of a kind.
+
+    It is called with the job and the job's params, and can return a message
+    to show with the finished job.
+    """
+
+    def register(func):
+        handlers[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, **params):
+    if kind not in handlers:
+        raise ValueError("Unknown job kind %s" % kind)
+    return Job.objects.create(kind=kind, params=params)
+
+
+def enqueue_once(kind, **params):
+    """Queue a job, unless the same job is already waiting to run."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update()
+            .filter(kind=kind, params=params, status=Job.QUEUED)
+            .first()
+        )
+        if job is None:
+            job = enqueue(kind, **params)
+    return job
+
+
+def enqueue_refresh(athlete_season_ids):
+    """Queue athlete seasons to be recalculated.
+
+    They are added to the recalculation job already waiting, if there is one.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update()
+            .filter(kind="refresh_athlete_seasons", status=Job.QUEUED)
+            .order_by("created")
+            .first()
+        )
+        if job is None:
+            return enqueue(
+                "refresh_athlete_seasons",
+                athlete_season_ids=sorted(set(athlete_season_ids)),
+            )
+        job.params["athlete_season_ids"] = sorted(
+            set(job.params["athlete_season_ids"]) | set(athlete_season_ids)
+        )
+        job.save(update_fields=["params"])
+    return job
+
+
+def requeue_stale():
+    """Queue again running jobs whose worker has stopped sending heartbeats.
+
+    Jobs which have already been run JOB_MAX_ATTEMPTS times are failed.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat__lt=now - datetime.timedelta(seconds=settings.JOB_LEASE_TIMEOUT),
+    )
+    stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status=Job.FAILED,
+        message="The worker running this job stopped responding",
+        finished=now,
+    )
+    return stale.update(status=Job.QUEUED, worker="", heartbeat=None)
+
+
+def claim(worker):
+    """Mark the oldest queued job as running, and return it."""
+    requeue_stale()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED)
+            .order_by("created")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.worker = worker
+        job.started = job.heartbeat = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=["status", "worker", "started", "heartbeat", "attempts"])
+    return job
+
+
+def leased(job):
+    """The job, if this run of it hasn't been given up on and queued again."""
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+
+
+@contextlib.contextmanager
+def heartbeat(job):
+    """Record a heartbeat for the job regularly while the block runs."""
+    done = threading.Event()
+
+    def beat():
+        try:
+            while not done.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                leased(job).update(heartbeat=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def run(job):
+    with heartbeat(job):
+        try:
+            message = handlers[job.kind](job, **job.params)
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            status = Job.FAILED
+            message = traceback.format_exc()
+        else:
+            status = Job.DONE
+    job.status = status
+    job.message = message or ""
+    job.finished = timezone.now()
+    leased(job).update(status=job.status, message=job.message, finished=job.finished)
+
+
+@handler("import_event")
+def import_event(job, event_id):
+    event = Event.objects.get(pk=event_id)
+    job.set_progress(0, total=2, message="Fetching scores from the extranet")
+    data = fetch_shoot_return(event.extranet_id)
+    if not len(data):
+        return "No scores received from API"
+    job.set_progress(1, message="Importing %s records" % len(data))
+    total_created = import_event_scores(event, parse_shoot_return(data))
+    job.set_progress(2)
+    return "%s new scores imported for %s" % (total_created, event)
+
+
+@handler("commit_import_batch")
+def commit_import_batch(job, batch_id):
+    batch = (
+        ImportBatch.objects.filter(pk=batch_id, committed__isnull=True)
+        .select_related("event")
+        .first()
+    )
+    if batch is None:
+        return "Nothing to import, the upload has already been imported"
+    created = commit(batch)
+    return "%s new scores imported for %s" % (created, batch.event)
+
+
+@handler("update_handicaps")
+def update_handicaps(job, season=None, agb_numbers=None, chunk_size=2000):
+    seasons = AthleteSeason.objects.all()
+    if season:
+        seasons = seasons.filter(season__year=season)
+    if agb_numbers:
+        seasons = seasons.filter(athlete__agb_number__in=agb_numbers)
+    athlete_season_ids = list(seasons.values_list("pk", flat=True))
+
+    updated = scores = 0
+    job.set_progress(0, total=len(athlete_season_ids))
+    for chunk in itertools.batched(athlete_season_ids, chunk_size):
+        chunk_updated, chunk_scores = update_agg_handicaps(
+            AthleteSeason.objects.filter(pk__in=chunk)
+        )
+        updated += chunk_updated
+        scores += chunk_scores
+        job.set_progress(updated)
+    return "Updated %s athlete seasons from %s scores" % (updated, scores)
+
+
+@handler("rerank")
+def rerank_all(job):
+    job.set_progress(0, total=1)
+    ranked = rerank()
+    job.set_progress(1)
+    return "Ranked %s athletes" % ranked
+
+
+@handler("refresh_athlete_seasons")
+def refresh_seasons(job, athlete_season_ids):
+    refresh_athlete_seasons(athlete_season_ids)
+    return "Recalculated %s athlete seasons" % len(athlete_season_ids)
+
+
+@handler("publish_rankings")
+def publish_rankings(job, keep=3):
+    snapshot = publish(keep=keep)
+    if not snapshot.live:
+        return "Ranks changed while rendering, snapshot not published"
+    return "Published rankings snapshot %s" % snapshot.version
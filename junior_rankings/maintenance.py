@@ -0,0 +1,147 @@
+import contextlib
+import functools
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+import sentry_sdk
+
+from . import freshness
+from .aggregates import update_agg_handicaps
+from .models import AthleteSeason, Score
+from .ranking import rerank
+
+# Whether this thread is in refresh_once() or refresh_in_worker(), and the
+# athlete seasons changed in its current transaction
+_pending = threading.local()
+
+
+def _changed(queued):
+    """Athlete seasons changed in this thread's transaction, not yet handled."""
+    if not hasattr(_pending, "changed"):
+        _pending.changed = {False: set(), True: set()}
+    return _pending.changed[queued]
+
+
+def handle_changed(queued):
+    """Recalculate, or queue, everything changed so far once a transaction
+    commits.
+
+    A callback is registered for each change, and the first to run takes
+    them all, so a whole import is recalculated once. Changes which were
+    rolled back are recalculated along with the next commit, which does no
+    harm.
+    """
+    athlete_season_ids = _changed(queued)
+    if not athlete_season_ids:
+        return
+    _pending.changed[queued] = set()
+    if queued:
+        from .jobs import enqueue_refresh
+
+        enqueue_refresh(athlete_season_ids)
+    elif getattr(_pending, "deferred", None) is not None:
+        _pending.deferred.update(athlete_season_ids)
+    else:
+        refresh_or_queue(athlete_season_ids)
+
+
+def mark_athlete_seasons_changed(athlete_season_ids):
+    # Changes made under refresh_in_worker() are queued for the worker
+    queued = getattr(_pending, "in_worker", False)
+    if not transaction.get_connection().in_atomic_block:
+        if not queued and getattr(_pending, "deferred", None) is not None:
+            _pending.deferred.update(athlete_season_ids)
+        else:
+            # Every save outside a transaction commits by itself, so rather
+            # than recalculate after each one they are collected in a job
+            from .jobs import enqueue_refresh
+
+            enqueue_refresh(athlete_season_ids)
+        return
+    _changed(queued).update(athlete_season_ids)
+    transaction.on_commit(functools.partial(handle_changed, queued))
+
+
+def refresh_or_queue(athlete_season_ids):
+    """Recalculate now, or leave it to the worker if that fails.
+
+    The changes have already been committed by the time this runs, so an
+    error is reported rather than raised.
+    """
+    from .jobs import enqueue_refresh
+
+    try:
+        refresh_athlete_seasons(athlete_season_ids)
+    except Exception as e:
+        sentry_sdk.capture_exception(e)
+        enqueue_refresh(athlete_season_ids)
+
+
+@contextlib.contextmanager
+def refresh_once():
+    """Recalculate once when the block ends, not after each commit in it."""
+    if getattr(_pending, "deferred", None) is not None:
+        yield
+        return
+    _pending.deferred = set()
+    try:
+        yield
+    finally:
+        athlete_season_ids = _pending.deferred
+        _pending.deferred = None
+        if athlete_season_ids:
+            refresh_or_queue(athlete_season_ids)
+
+
+@contextlib.contextmanager
+def refresh_in_worker():
+    """Queue a job to recalculate changes made in the block, e.g. in a request."""
+    in_worker = getattr(_pending, "in_worker", False)
+    _pending.in_worker = True
+    try:
+        yield
+    finally:
+        _pending.in_worker = in_worker
+
+
+@transaction.atomic
+def refresh_athlete_seasons(athlete_season_ids):
+    """Recalculate aggregates, and ranks in any division where they changed."""
+    seasons = AthleteSeason.objects.filter(pk__in=athlete_season_ids)
+    before = dict(seasons.values_list("pk", "agg_handicap"))
+    update_agg_handicaps(seasons)
+    after = dict(seasons.values_list("pk", "agg_handicap"))
+
+    changed = [pk for pk in after if after[pk] != before.get(pk)]
+    if not changed:
+        return
+    divisions = set(
+        AthleteSeason.objects.filter(pk__in=changed).values_list(
+            "bowstyle", "athlete__gender"
+        )
+    )
+    rerank(divisions)
+
+
+@receiver(post_init, sender=Score)
+def remember_athlete_season(sender, instance, **kwargs):
+    # Read from __dict__ to avoid loading a deferred field
+    instance._loaded_athlete_season_id = instance.__dict__.get("athlete_season_id")
+
+
+@receiver(post_save, sender=Score)
+def score_saved(sender, instance, **kwargs):
+    changed = {instance.athlete_season_id, instance._loaded_athlete_season_id}
+    changed.discard(None)
+    instance._loaded_athlete_season_id = instance.athlete_season_id
+    freshness.touch(freshness.SCORES)
+    mark_athlete_seasons_changed(changed)
+
+
+@receiver(post_delete, sender=Score)
+def score_deleted(sender, instance, **kwargs):
+    freshness.touch(freshness.SCORES)
+    mark_athlete_seasons_changed([instance.athlete_season_id])
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from junior_rankings.maintenance import refresh_once
+from junior_rankings.models import Score, SubmissionScore
+
+
+class Command(BaseCommand):
+    help = "Fill in the stored handicap for scores and submitted scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recalculate every row, not only those without a handicap",
+        )
+
+    def handle(self, *args, **options):
+        # Changed handicaps change aggregates, recalculated once at the end
+        with refresh_once():
+            for model in [Score, SubmissionScore]:
+                self.backfill(model, options["chunk_size"], options["all"])
+
+    def backfill(self, model, chunk_size, recalculate_all):
+        queryset = model.objects.order_by("pk")
+        if not recalculate_all:
+            queryset = queryset.filter(handicap__isnull=True)
+
+        self.stdout.write("Updating %s" % model._meta.verbose_name_plural)
+        total = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk).only(
+                    "pk", "athlete_season", "shot_round", "score", "handicap"
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            changed = []
+            for row in rows:
+                handicap = row.handicap
+                row.set_handicap()
+                if row.handicap != handicap:
+                    changed.append(row)
+            with transaction.atomic():
+                model.objects.bulk_update(changed, ["handicap"])
+            total += len(changed)
+            self.stdout.write("%s rows updated" % total)
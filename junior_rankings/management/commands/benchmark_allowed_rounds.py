@@ -0,0 +1,42 @@
+import itertools
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from archerydjango.fields import DbBowstyles, DbGender
+
+from junior_rankings.allowed_rounds import (
+    allowed_families,
+    calculate_allowed_rounds,
+    get_allowed_rounds,
+    junior_age_groups,
+)
+
+
+class Command(BaseCommand):
+    help = "Compare indexed allowed round lookups with calculating them each time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        keys = list(
+            itertools.product(
+                allowed_families, DbGender, junior_age_groups, DbBowstyles
+            )
+        )
+        for key in keys:
+            if get_allowed_rounds(*key) != calculate_allowed_rounds(*key):
+                raise CommandError("Index does not match for %s" % (key,))
+
+        for name, func in [
+            ("calculated", calculate_allowed_rounds),
+            ("indexed", get_allowed_rounds),
+        ]:
+            elapsed = timeit.timeit(
+                lambda: [func(*key) for key in keys], number=options["repeat"]
+            )
+            calls = len(keys) * options["repeat"]
+            self.stdout.write(
+                "%s: %.2fus per lookup" % (name, elapsed / calls * 1_000_000)
+            )
@@ -0,0 +1,28 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from junior_rankings.exports import ranking_rows
+from junior_rankings.models import AthleteSeason
+
+
+class Command(BaseCommand):
+    help = "Export ranked athletes and their counting scores as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("filename", type=str)
+        parser.add_argument("--season", type=int)
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        seasons = AthleteSeason.objects.all()
+        if options["season"]:
+            seasons = seasons.filter(season__year=options["season"])
+
+        with open(options["filename"], "w", newline="") as f:
+            writer = csv.writer(f)
+            total = -1
+            for row in ranking_rows(seasons, chunk_size=options["chunk_size"]):
+                writer.writerow(row)
+                total += 1
+        self.stdout.write("Exported %s athletes" % total)
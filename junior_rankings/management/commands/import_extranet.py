@@ -0,0 +1,95 @@
+import concurrent.futures
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from junior_rankings.extranet import (
+    fetch_shoot_return,
+    import_scores,
+    parse_shoot_return,
+)
+from junior_rankings.models import Event
+
+
+class Command(BaseCommand):
+    help = "Import scores for many events from the AGB extranet at once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("extranet_id", nargs="*", type=str)
+        parser.add_argument("--season", type=int, help="Events in this season")
+        parser.add_argument(
+            "--from", dest="date_from", type=datetime.date.fromisoformat
+        )
+        parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of events to fetch at once",
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.exclude(extranet_id="").order_by("date")
+        if options["extranet_id"]:
+            events = events.filter(extranet_id__in=options["extranet_id"])
+        if options["season"]:
+            events = events.filter(date__year=options["season"])
+        if options["date_from"]:
+            events = events.filter(date__gte=options["date_from"])
+        if options["date_to"]:
+            events = events.filter(date__lte=options["date_to"])
+        events = list(events)
+        if not events:
+            raise CommandError("No events with an extranet ID match")
+
+        start = time.perf_counter()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=options["workers"])
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def fetch(event):
+            fetch_start = time.perf_counter()
+            data = fetch_shoot_return(event.extranet_id, session=session)
+            return data, time.perf_counter() - fetch_start
+
+        event_entries = []
+        with concurrent.futures.ThreadPoolExecutor(options["workers"]) as executor:
+            futures = {executor.submit(fetch, event): event for event in events}
+            for future in concurrent.futures.as_completed(futures):
+                event = futures[future]
+                try:
+                    data, elapsed = future.result()
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    self.stderr.write("%s: fetching failed: %s" % (event, e))
+                    continue
+                entries = parse_shoot_return(data)
+                event_entries.append((event, entries))
+                self.stdout.write(
+                    "%s: fetched %s records in %.2fs" % (event, len(entries), elapsed)
+                )
+        fetched = time.perf_counter() - start
+
+        load_start = time.perf_counter()
+        created = import_scores(event_entries)
+        loaded = time.perf_counter() - load_start
+
+        for event, entries in event_entries:
+            self.stdout.write("%s: %s new scores" % (event, created[event.pk]))
+        records = sum(len(entries) for event, entries in event_entries)
+        self.stdout.write(
+            "Fetched %s events in %.2fs, loaded %s records and %s new scores in "
+            "%.2fs (%.0f records/sec)"
+            % (
+                len(event_entries),
+                fetched,
+                records,
+                sum(created.values()),
+                loaded,
+                records / loaded if loaded else 0,
+            )
+        )
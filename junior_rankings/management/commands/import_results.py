@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from junior_rankings.models import Event
+from junior_rankings.results_files import ResultsFileError, import_results_file
+
+
+class Command(BaseCommand):
+    help = "Import a tournament software results export (CSV or XML) for an event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_id", type=int)
+        parser.add_argument("filename", type=str)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be imported, without keeping it",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(pk=options["event_id"])
+        except Event.DoesNotExist:
+            raise CommandError("No event with ID %s" % options["event_id"])
+
+        start = time.perf_counter()
+        try:
+            with open(options["filename"], "rb") as f:
+                report = import_results_file(
+                    event, f, options["filename"], dry_run=options["dry_run"]
+                )
+        except ResultsFileError as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - start
+
+        for (category, round_name), count in report["rounds"]:
+            self.stdout.write("%s: %s scores on %s" % (category, count, round_name))
+        for reason, count in report["skipped"].items():
+            self.stdout.write("Skipped %s records: %s" % (count, reason))
+        self.stdout.write(
+            "%s %s new scores from %s records in %.2fs"
+            % (
+                "Would import" if report["dry_run"] else "Imported",
+                report["created"],
+                report["records"],
+                elapsed,
+            )
+        )
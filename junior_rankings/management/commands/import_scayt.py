@@ -1,14 +1,45 @@
+import itertools
 import json
+import re
+import time
+from collections import Counter
 
-from django.conf import settings
 from django.core.management.base import BaseCommand
 
-import requests
+from archerydjango.fields import DbBowstyles, DbGender
+from junior_rankings.allowed_rounds import all_rounds
+from junior_rankings.extranet import import_scores
+from junior_rankings.maintenance import refresh_once
+from junior_rankings.models import EventAlias
 
-from archerydjango.fields import DbBowstyles
-from archerydjango.utils import get_age_group
-from junior_rankings.allowed_rounds import all_rounds, get_allowed_rounds
-from junior_rankings.models import Athlete, AthleteSeason, Event, Score, Season
+WHITESPACE = re.compile(r"[\s,]*")
+
+
+def iter_json_array(f, read_size=1 << 16):
+    """Yield the items of a JSON array from a file, without reading it all."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    eof = False
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if buffer.startswith("]", pos):
+            return
+        try:
+            # Rows are objects, so a row cut off at the end of the buffer
+            # never decodes.
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(read_size)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield item
 
 
 class Command(BaseCommand):
@@ -16,86 +47,52 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("filename", type=str)
+        parser.add_argument("--chunk-size", type=int, default=2000)
 
     def handle(self, *args, **options):
-        with open(options["filename"]) as f:
-            data = json.loads(f.read())
-
-        event_lookup = {
-            "Sussex Junior Championships": 42693,
-            "Wallingford Good Friday 720": 42334,
-            "SCAS Junior Championships & SCAYT Final": 42333,
-            "Wallingford Junior Matchplay": 42335,
-            "Noak Hill Double 720": 42098,
-            "Buckinghamshire Championships": 42309,
-            "Woking Open": 42457,
-            "Essex Target Championships": 42170,
-            "Wallingford Summer Metrics": 42337,
-            "Oxfordshire Junior Championships": 42340,
-            "Harlequin 60th Diana Shoot": 41954,
-            "Andover Archers Saxon Shoot": 42047,
-            "SCCA Junior 900": 42489,
-            "Hillingdon 2 Day Double 720 - Day 1": 41650,
-            "Peacock World Archery Weekend - Day 2": 42153,
-            "Wymondham WA Weekend - Day 1": 41887,
-            "Forest of Bere Bowmen Open": 41879,
-            "Berkshire Championships": 42297,
-            "Oxfordshire Outdoor Championships": 42336,
-            "Rayleigh Town 720": 42406,
-            "Wymondham WA Weekend - Day 2": 41888,
-            "Whiteleaf Bowmen Open": 42308,
-            "Hillingdon 2 Day Double 720 - Day 2": "41650-2",
-            "Wallingford Castle Archers 720": 42338,
-            "Essex WA1440 Championship": 42526,
+        events = {
+            alias.name: alias.event
+            for alias in EventAlias.objects.filter(source="scayt").select_related(
+                "event"
+            )
         }
+        # Double rounds appear as two rows for the same athlete and event
+        shot_count = Counter()
+        read = Counter()
 
-        season = Season.objects.order_by("-year").first()
-
-        for s in data:
-            if s["event"] not in event_lookup:
-                continue
-            event = Event.objects.get(identifier=event_lookup[s["event"]])
+        def entries(rows):
+            for s in rows:
+                read["rows"] += 1
+                if s["event"] not in events:
+                    continue
+                event = events[s["event"]]
+                key = (event.pk, s["agb_number"], s["bowstyle"])
+                shot_count[key] += 1
+                yield event, {
+                    "agb_number": s["agb_number"],
+                    "gender": DbGender(s["gender"]),
+                    "bowstyle": DbBowstyles(s["bowstyle"]),
+                    "shot_round": all_rounds[s["round"]],
+                    "scores": [int(s["score"])],
+                    "round_number": shot_count[key],
+                }
 
-            try:
-                athlete_season = AthleteSeason.objects.get(
-                    athlete__agb_number=s["agb_number"], bowstyle=s["bowstyle"]
-                )
-                athlete = athlete_season.athlete
-            except AthleteSeason.DoesNotExist:
-                response = requests.get(
-                    "https://records.agbextranet.org.uk/Public/AGBLookup.php",
-                    params={"agbno": s["agb_number"]},
-                    headers={"Authorization": "Bearer %s" % settings.AGB_API_TOKEN},
+        start = time.perf_counter()
+        created = 0
+        # Each chunk is its own transaction, with one recalculation at the end
+        with open(options["filename"]) as f, refresh_once():
+            for chunk in itertools.batched(
+                entries(iter_json_array(f)), options["chunk_size"]
+            ):
+                event_entries = {}
+                for event, entry in chunk:
+                    event_entries.setdefault(event, []).append(entry)
+                created += sum(import_scores(list(event_entries.items())).values())
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    "%s rows, %s new scores (%.0f rows/sec)"
+                    % (read["rows"], created, read["rows"] / elapsed)
                 )
-                api_athlete = response.json()["results"][0]
-                athlete = Athlete(
-                    agb_number=s["agb_number"],
-                    forename=api_athlete["Firstname"],
-                    surname=api_athlete["Lastname"],
-                    year=int(api_athlete["YOB"]),
-                    gender=s["gender"],
-                )
-                athlete_season = AthleteSeason(
-                    athlete=athlete,
-                    bowstyle=DbBowstyles(s["bowstyle"]),
-                    season=season,
-                    age_group=get_age_group(athlete.year, event.date.year),
-                )
-
-            allowed_rounds = get_allowed_rounds(
-                family=event.round_family,
-                gender=athlete.gender,
-                age_group=athlete_season.age_group,
-                bowstyle=athlete_season.bowstyle,
-            )
-            if all_rounds[s["round"]] not in allowed_rounds:
-                continue
-
-            athlete.save()
-            athlete_season.save()
-            Score.objects.create(
-                athlete_season=athlete_season,
-                event=event,
-                score=s["score"],
-                shot_round=s["round"],
-            )
+        self.stdout.write(
+            "Imported %s rows in %.2fs" % (read["rows"], time.perf_counter() - start)
+        )
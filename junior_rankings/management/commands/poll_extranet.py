@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from junior_rankings.polling import events_to_poll, poll
+
+
+class Command(BaseCommand):
+    help = "Import new and changed results for recent events from the extranet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep polling, waiting this many seconds between polls",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.poll(options["workers"])
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def poll(self, workers):
+        events = list(events_to_poll())
+        changes, failed = poll(events, workers=workers)
+        for event, records, created in changes:
+            self.stdout.write(
+                "%s: %s changed records, %s new scores" % (event, records, created)
+            )
+        for event, error in failed:
+            self.stderr.write("%s: fetching failed: %s" % (event, error))
+        self.stdout.write("Polled %s events, %s changed" % (len(events), len(changes)))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from junior_rankings import snapshots
+from junior_rankings.jobs import enqueue_once
+
+
+class Command(BaseCommand):
+    help = "Publish a static snapshot of all rankings pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep", type=int, default=3, help="Number of old snapshots to keep"
+        )
+        parser.add_argument(
+            "--queue", action="store_true", help="Run in the background worker"
+        )
+
+    def handle(self, *args, **options):
+        if options["queue"]:
+            job = enqueue_once("publish_rankings", keep=options["keep"])
+            self.stdout.write("Queued job %s" % job.pk)
+            return
+
+        snapshot = snapshots.publish(self.render, keep=options["keep"])
+        if snapshot.live:
+            self.stdout.write("Published rankings snapshot %s" % snapshot.version)
+        else:
+            self.stdout.write(
+                "Ranks changed while rendering, snapshot %s not published"
+                % snapshot.version
+            )
+
+    def render(self, path):
+        pages = snapshots.render(path)
+        self.stdout.write("Rendered %s" % path)
+        return pages
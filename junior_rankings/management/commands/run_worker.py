@@ -0,0 +1,67 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from junior_rankings import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help="Number of jobs to run at once",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop once the queue is empty, rather than waiting for jobs",
+        )
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        # Finish the running jobs when Heroku asks the dyno to stop
+        signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+        signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+        name = "%s:%s" % (socket.gethostname(), os.getpid())
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=("%s:%s" % (name, n), stopping, options),
+            )
+            for n in range(options["concurrency"])
+        ]
+        self.stdout.write(
+            "Worker %s running %s jobs at once" % (name, options["concurrency"])
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def work(self, name, stopping, options):
+        try:
+            while not stopping.is_set():
+                job = jobs.claim(name)
+                if job is None:
+                    if options["burst"]:
+                        break
+                    stopping.wait(options["poll_interval"])
+                    continue
+                self.stdout.write("Running %s" % job)
+                jobs.run(job)
+                self.stdout.write("Finished %s" % job)
+        finally:
+            connection.close()
@@ -0,0 +1,52 @@
+import itertools
+
+from django.core.management.base import BaseCommand
+
+from junior_rankings.agb_lookup import AthleteLookupClient
+from junior_rankings.athlete_registry import refresh, stale_before
+from junior_rankings.models import Athlete, RegisteredAthlete
+
+
+class Command(BaseCommand):
+    help = "Refresh the local registry of AGB athlete lookups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("agb_no", nargs="*", type=str)
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Refresh every registered athlete, not only stale ones",
+        )
+        parser.add_argument(
+            "--athletes",
+            action="store_true",
+            help="Also register every athlete in the rankings",
+        )
+
+    def handle(self, *args, **options):
+        if options["agb_no"]:
+            agb_numbers = set(options["agb_no"])
+        else:
+            registered = RegisteredAthlete.objects.all()
+            if not options["all"]:
+                registered = registered.filter(fetched__lt=stale_before())
+            agb_numbers = set(registered.values_list("agb_number", flat=True))
+            if options["athletes"]:
+                agb_numbers |= set(
+                    Athlete.objects.exclude(
+                        agb_number__in=RegisteredAthlete.objects.values("agb_number")
+                    ).values_list("agb_number", flat=True)
+                )
+
+        total = 0
+        failed = 0
+        with AthleteLookupClient() as client:
+            for batch in itertools.batched(sorted(agb_numbers), options["batch_size"]):
+                results, errors = refresh(batch, client)
+                total += len(batch)
+                failed += len(errors)
+                self.stdout.write(
+                    "%s of %s athletes refreshed, %s lookups failed"
+                    % (total, len(agb_numbers), failed)
+                )
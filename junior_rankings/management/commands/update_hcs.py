@@ -1,5 +1,12 @@
+import time
+
 from django.core.management.base import BaseCommand
 
+from junior_rankings.aggregates import (
+    update_agg_handicaps,
+    update_agg_handicaps_parallel,
+)
+from junior_rankings.jobs import enqueue
 from junior_rankings.models import AthleteSeason
 
 
@@ -8,19 +15,53 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("agb_no", type=int, nargs="*")
+        parser.add_argument("--season", type=int, help="Only update this season")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Split the work across this many processes",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--queue", action="store_true", help="Run in the background worker"
+        )
 
     def handle(self, *args, **options):
+        if options["queue"]:
+            job = enqueue(
+                "update_handicaps",
+                season=options["season"],
+                agb_numbers=[str(n) for n in options["agb_no"]],
+                chunk_size=options["chunk_size"],
+            )
+            self.stdout.write("Queued job %s" % job.pk)
+            return
+
+        seasons = AthleteSeason.objects.all()
+        if options["season"]:
+            seasons = seasons.filter(season__year=options["season"])
         if options["agb_no"]:
-            for agb_no in options["agb_no"]:
-                season = AthleteSeason.objects.get(athlete__agb_number=agb_no)
-                self.handle_row(season)
+            self.stdout.write(
+                "Updating Archery GB Numbers %s"
+                % ", ".join(map(str, options["agb_no"]))
+            )
+            seasons = seasons.filter(athlete__agb_number__in=options["agb_no"])
         else:
             self.stdout.write("Updating all athletes")
-            for season in AthleteSeason.objects.all():
-                self.handle_row(season)
-
-    def handle_row(self, season):
-        self.stdout.write("Updating Archery GB Number %s" % season.athlete.agb_number)
-        season.set_agg_handicap()
-        season.save()
-        self.stdout.write("Aggregate handicap: %s" % season.agg_handicap)
+
+        start = time.perf_counter()
+        if options["workers"] > 1:
+            updated, scores = update_agg_handicaps_parallel(
+                seasons, options["workers"], chunk_size=options["chunk_size"]
+            )
+        else:
+            updated, scores = update_agg_handicaps(
+                seasons, batch_size=options["chunk_size"]
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            "Updated %s athlete seasons from %s scores in %.2fs (%.0f scores/sec)"
+            % (updated, scores, elapsed, scores / elapsed if elapsed else 0)
+        )
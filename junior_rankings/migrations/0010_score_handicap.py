@@ -0,0 +1,35 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0009_ranking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="score",
+            name="handicap",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="submissionscore",
+            name="handicap",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="score",
+            index=models.Index(
+                fields=["athlete_season", "handicap"], name="score_season_handicap_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="submissionscore",
+            index=models.Index(
+                fields=["submission", "handicap"], name="subscore_submission_hc_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:57
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_timestamps(apps, schema_editor):
+    LastModified = apps.get_model("junior_rankings", "LastModified")
+    now = timezone.now()
+    for name in ["athletes", "events", "rankings", "scores"]:
+        LastModified.objects.create(name=name, timestamp=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0010_score_handicap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LastModified",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("timestamp", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "last modified",
+            },
+        ),
+        migrations.RunPython(create_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+def number_rounds(apps, schema_editor):
+    # Events shot twice already have two scores per athlete season
+    Score = apps.get_model("junior_rankings", "Score")
+    seen = {}
+    renumbered = []
+    for score in Score.objects.order_by("pk").only("athlete_season", "event"):
+        key = (score.athlete_season_id, score.event_id)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            score.round_number = seen[key]
+            renumbered.append(score)
+    Score.objects.bulk_update(renumbered, ["round_number"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0011_lastmodified"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="score",
+            name="round_number",
+            field=models.PositiveSmallIntegerField(
+                default=1, help_text="For events where the round is shot more than once"
+            ),
+        ),
+        migrations.RunPython(number_rounds, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="score",
+            constraint=models.UniqueConstraint(
+                fields=("athlete_season", "event", "round_number"),
+                name="score_unique_per_event_round",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0012_score_round_number"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RegisteredAthlete",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("agb_number", models.CharField(max_length=256, unique=True)),
+                (
+                    "data",
+                    models.JSONField(
+                        blank=True, help_text="Empty if not found", null=True
+                    ),
+                ),
+                ("fetched", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0014_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="extranet_changed",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="extranet_hash",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="extranet_records",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Names used in the 2024 SCAYT results file, previously in import_scayt
+SCAYT_EVENTS = {
+    "Sussex Junior Championships": 42693,
+    "Wallingford Good Friday 720": 42334,
+    "SCAS Junior Championships & SCAYT Final": 42333,
+    "Wallingford Junior Matchplay": 42335,
+    "Noak Hill Double 720": 42098,
+    "Buckinghamshire Championships": 42309,
+    "Woking Open": 42457,
+    "Essex Target Championships": 42170,
+    "Wallingford Summer Metrics": 42337,
+    "Oxfordshire Junior Championships": 42340,
+    "Harlequin 60th Diana Shoot": 41954,
+    "Andover Archers Saxon Shoot": 42047,
+    "SCCA Junior 900": 42489,
+    "Hillingdon 2 Day Double 720 - Day 1": 41650,
+    "Peacock World Archery Weekend - Day 2": 42153,
+    "Wymondham WA Weekend - Day 1": 41887,
+    "Forest of Bere Bowmen Open": 41879,
+    "Berkshire Championships": 42297,
+    "Oxfordshire Outdoor Championships": 42336,
+    "Rayleigh Town 720": 42406,
+    "Wymondham WA Weekend - Day 2": 41888,
+    "Whiteleaf Bowmen Open": 42308,
+    "Hillingdon 2 Day Double 720 - Day 2": "41650-2",
+    "Wallingford Castle Archers 720": 42338,
+    "Essex WA1440 Championship": 42526,
+}
+
+
+def create_scayt_aliases(apps, schema_editor):
+    Event = apps.get_model("junior_rankings", "Event")
+    EventAlias = apps.get_model("junior_rankings", "EventAlias")
+    events = {
+        event.identifier: event
+        for event in Event.objects.filter(
+            identifier__in=[str(identifier) for identifier in SCAYT_EVENTS.values()]
+        )
+    }
+    EventAlias.objects.bulk_create(
+        EventAlias(source="scayt", name=name, event=events[str(identifier)])
+        for name, identifier in SCAYT_EVENTS.items()
+        if str(identifier) in events
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0015_event_extranet_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventAlias",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(default="scayt", max_length=64)),
+                ("name", models.CharField(max_length=512)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="junior_rankings.event",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "event aliases",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "name"), name="eventalias_unique_name"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_scayt_aliases, migrations.RunPython.noop),
+    ]
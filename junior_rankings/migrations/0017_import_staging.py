@@ -0,0 +1,84 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0016_eventalias"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=256)),
+                ("rows", models.PositiveIntegerField(default=0)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("committed", models.DateTimeField(blank=True, null=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="junior_rankings.event",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "import batches",
+            },
+        ),
+        migrations.CreateModel(
+            name="StagedScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("agb_number", models.CharField(max_length=256)),
+                ("forename", models.CharField(blank=True, default="", max_length=256)),
+                ("surname", models.CharField(blank=True, default="", max_length=256)),
+                ("category", models.CharField(max_length=20)),
+                ("shot_round", models.CharField(blank=True, default="", max_length=64)),
+                ("score", models.PositiveIntegerField()),
+                (
+                    "year",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Year of Birth"
+                    ),
+                ),
+                ("athlete_known", models.BooleanField(default=False)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="junior_rankings.importbatch",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["batch", "athlete_known", "agb_number"],
+                        name="staged_batch_known_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0017_import_staging"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0018_submission_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(
+                condition=models.Q(("processed__isnull", True)),
+                fields=["athlete_season"],
+                name="submission_unprocessed_idx",
+            ),
+        ),
+    ]
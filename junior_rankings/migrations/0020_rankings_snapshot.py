@@ -0,0 +1,74 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0019_submission_unprocessed_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RankingsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.CharField(max_length=64, unique=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("live", models.BooleanField(default=False)),
+            ],
+            options={
+                "ordering": ["-created"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("live", True)),
+                        fields=("live",),
+                        name="snapshot_one_live",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SnapshotPage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=256)),
+                ("is_json", models.BooleanField(default=False)),
+                ("encoding", models.CharField(blank=True, default="", max_length=8)),
+                ("content", models.BinaryField()),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="junior_rankings.rankingssnapshot",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("snapshot", "path", "is_json", "encoding"),
+                        name="snapshot_page_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:40
+
+from django.db import migrations
+
+from junior_rankings.handicap_tables import get_handicap_table
+
+
+def backfill_handicaps(apps, schema_editor, chunk_size=2000):
+    for name in ["Score", "SubmissionScore"]:
+        model = apps.get_model("junior_rankings", name)
+        rows = []
+        for row in (
+            model.objects.filter(handicap__isnull=True)
+            .only("pk", "shot_round", "score")
+            .iterator(chunk_size=chunk_size)
+        ):
+            table = get_handicap_table(row.shot_round)
+            if table.is_valid_score(row.score):
+                row.handicap = table.handicap(row.score)
+                rows.append(row)
+            if len(rows) == chunk_size:
+                model.objects.bulk_update(rows, ["handicap"])
+                rows = []
+        model.objects.bulk_update(rows, ["handicap"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0021_job_heartbeat"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_handicaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_athlete_season(apps, schema_editor):
+    Submission = apps.get_model("junior_rankings", "Submission")
+    SubmissionScore = apps.get_model("junior_rankings", "SubmissionScore")
+    SubmissionScore.objects.update(
+        athlete_season=models.Subquery(
+            Submission.objects.filter(pk=models.OuterRef("submission")).values(
+                "athlete_season"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0022_backfill_handicaps"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submissionscore",
+            name="athlete_season",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="junior_rankings.athleteseason",
+            ),
+        ),
+        migrations.RunPython(copy_athlete_season, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="submissionscore",
+            name="athlete_season",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="junior_rankings.athleteseason",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="submissionscore",
+            name="subscore_submission_hc_idx",
+        ),
+        migrations.AddIndex(
+            model_name="submissionscore",
+            index=models.Index(
+                fields=["athlete_season", "handicap"],
+                name="subscore_season_handicap_idx",
+            ),
+        ),
+    ]
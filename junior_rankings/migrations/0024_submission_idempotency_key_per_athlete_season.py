@@ -0,0 +1,27 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("junior_rankings", "0023_submissionscore_athlete_season"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="submission",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="submission",
+            constraint=models.UniqueConstraint(
+                fields=("athlete_season", "idempotency_key"),
+                name="submission_idempotency_key_unique",
+            ),
+        ),
+    ]
@@ -1,8 +1,6 @@
 from django.core import validators
 from django.db import models
 
-from archeryutils.handicaps import handicap_from_score
-
 from archerydjango.fields import (
     AgeField,
     BowstyleField,
@@ -11,6 +9,20 @@ from archerydjango.fields import (
 )
 
 from .allowed_rounds import all_available_rounds
+from .handicap_tables import get_handicap_table
+
+
+def rank_display(rank, is_equal):
+    if not rank:
+        return "-"
+    if is_equal:
+        return "%s=" % rank
+    else:
+        return rank
+
+
+def age_group_short(age_group):
+    return "U%s" % str(age_group)[-2:]
 
 
 class Season(models.Model):
@@ -62,32 +74,26 @@ class AthleteSeason(models.Model):
     agg_handicap = models.IntegerField(blank=True, null=True)
 
     def set_agg_handicap(self):
-        scores = self.score_set.all()
-        if len(scores) < 3:
+        handicaps = list(
+            self.score_set.filter(handicap__isnull=False)
+            .order_by("handicap")
+            .values_list("handicap", flat=True)[:3]
+        )
+        if len(handicaps) < 3:
             self.agg_handicap = None
             return
-        self.agg_handicap = int(sum(sorted(map(lambda s: s.handicap, scores))[:3]))
+        self.agg_handicap = sum(handicaps)
 
     @property
     def overall_rank_display(self):
-        if not self.overall_rank:
-            return "-"
-        if self.overall_rank_is_equal:
-            return "%s=" % self.overall_rank
-        else:
-            return self.overall_rank
+        return rank_display(self.overall_rank, self.overall_rank_is_equal)
 
     @property
     def age_group_rank_display(self):
-        if not self.age_group_rank:
-            return "-"
-        if self.age_group_rank_is_equal:
-            return "%s=" % self.age_group_rank
-        else:
-            return self.age_group_rank
+        return rank_display(self.age_group_rank, self.age_group_rank_is_equal)
 
     def age_group_short(self):
-        return "U%s" % str(self.age_group)[-2:]
+        return age_group_short(self.age_group)
 
     def __str__(self):
         return "%s in %s" % (self.athlete, self.season)
@@ -111,16 +117,172 @@ class Event(models.Model):
         ],
         help_text="To identify round by age group for imported events",
     )
+    # Results last seen on the extranet, to skip polls where nothing changed
+    extranet_hash = models.CharField(
+        max_length=64, blank=True, default="", editable=False
+    )
+    extranet_records = models.JSONField(default=dict, blank=True, editable=False)
+    extranet_changed = models.DateTimeField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
-class Score(models.Model):
+class EventAlias(models.Model):
+    """A name an event goes by in imported results files."""
+
+    source = models.CharField(max_length=64, default="scayt")
+    name = models.CharField(max_length=512)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+
+    class Meta:
+        verbose_name_plural = "event aliases"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "name"], name="eventalias_unique_name"
+            ),
+        ]
+
+    def __str__(self):
+        return "%s (%s)" % (self.name, self.source)
+
+
+class HandicapQuerySet(models.QuerySet):
+    """Keep the stored handicap in step on the bulk write paths."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_handicap()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if {"score", "shot_round"} & set(fields):
+            for obj in objs:
+                obj.set_handicap()
+            fields = list(set(fields) | {"handicap"})
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if not {"score", "shot_round"} & set(kwargs):
+            return super().update(**kwargs)
+        # Handicaps are worked out in Python, so they are updated afterwards
+        pks = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        objs = list(
+            self.model._base_manager.filter(pk__in=pks).only(
+                "pk", "shot_round", "score"
+            )
+        )
+        for obj in objs:
+            obj.set_handicap()
+        self.model._base_manager.bulk_update(objs, ["handicap"], batch_size=1000)
+        return rows
+
+
+class SubmissionScoreQuerySet(HandicapQuerySet):
+    """Copy the athlete season from the submission, as signals are not sent."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_athlete_season()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class ScoreQuerySet(HandicapQuerySet):
+    """Record score changes, and flag changed athlete seasons for
+    recalculation, as signals are not sent."""
+
+    aggregate_fields = {
+        "athlete_season",
+        "athlete_season_id",
+        "handicap",
+        "score",
+        "shot_round",
+    }
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from . import freshness
+        from .maintenance import mark_athlete_seasons_changed
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        freshness.touch(freshness.SCORES)
+        mark_athlete_seasons_changed({obj.athlete_season_id for obj in created})
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from . import freshness
+        from .maintenance import mark_athlete_seasons_changed
+
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        freshness.touch(freshness.SCORES)
+        if self.aggregate_fields & set(fields):
+            mark_athlete_seasons_changed({obj.athlete_season_id for obj in objs})
+        return rows
+
+    def update(self, **kwargs):
+        from . import freshness
+        from .maintenance import mark_athlete_seasons_changed
+
+        freshness.touch(freshness.SCORES)
+        if not self.aggregate_fields & set(kwargs):
+            return super().update(**kwargs)
+        changed = set(self.values_list("athlete_season_id", flat=True))
+        rows = super().update(**kwargs)
+        moved_to = kwargs.get("athlete_season", kwargs.get("athlete_season_id"))
+        if moved_to is not None:
+            changed.add(getattr(moved_to, "pk", moved_to))
+        mark_athlete_seasons_changed(changed)
+        return rows
+
+
+class HandicapMixin(object):
+    def set_handicap(self):
+        if self.score is None or self.shot_round is None:
+            self.handicap = None
+            return
+        table = get_handicap_table(self.shot_round)
+        if table.is_valid_score(int(self.score)):
+            self.handicap = table.handicap(int(self.score))
+        else:
+            self.handicap = None
+
+    def save(self, *args, **kwargs):
+        self.set_handicap()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"score", "shot_round"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"handicap"}
+        super().save(*args, **kwargs)
+
+
+class Score(HandicapMixin, models.Model):
     athlete_season = models.ForeignKey(AthleteSeason, on_delete=models.PROTECT)
     event = models.ForeignKey(Event, on_delete=models.PROTECT)
     shot_round = RoundField(all_available_rounds)
     score = models.PositiveIntegerField()
+    handicap = models.IntegerField(blank=True, null=True, editable=False)
+    round_number = models.PositiveSmallIntegerField(
+        default=1, help_text="For events where the round is shot more than once"
+    )
+
+    objects = ScoreQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["athlete_season", "handicap"],
+                name="score_season_handicap_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["athlete_season", "event", "round_number"],
+                name="score_unique_per_event_round",
+            ),
+        ]
 
     def __str__(self):
         return "%s shot %s on %s at %s" % (
@@ -130,31 +292,68 @@ class Score(models.Model):
             self.score,
         )
 
-    @property
-    def handicap(self):
-        return handicap_from_score(self.score, self.shot_round, "AGB", int_prec=True)
-
 
 class Submission(models.Model):
     athlete_season = models.ForeignKey(AthleteSeason, on_delete=models.PROTECT)
     submitted = models.DateTimeField(auto_now_add=True)
     processed = models.DateField(blank=True, null=True, editable=False)
+    # Sent by the app with each submission, so retries aren't saved twice
+    idempotency_key = models.CharField(
+        max_length=64, blank=True, null=True, editable=False
+    )
+
+    class Meta:
+        constraints = [
+            # Keys are only unique to an athlete's app
+            models.UniqueConstraint(
+                fields=["athlete_season", "idempotency_key"],
+                name="submission_idempotency_key_unique",
+            ),
+        ]
+        indexes = [
+            # Only the verification queue is read, which stays small as
+            # processed submissions pile up over the seasons
+            models.Index(
+                fields=["athlete_season"],
+                condition=models.Q(processed__isnull=True),
+                name="submission_unprocessed_idx",
+            ),
+        ]
 
     def __str__(self):
         return "Submission for %s" % self.athlete_season
 
 
-class SubmissionScore(models.Model):
+class SubmissionScore(HandicapMixin, models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.PROTECT)
+    # Copied from the submission, so scores are indexed by athlete season
+    athlete_season = models.ForeignKey(
+        AthleteSeason, on_delete=models.PROTECT, editable=False
+    )
     event = models.ForeignKey(Event, on_delete=models.PROTECT)
     shot_round = RoundField(rounds=all_available_rounds)
     score = models.PositiveIntegerField()
+    handicap = models.IntegerField(blank=True, null=True, editable=False)
     accepted = models.DateField(blank=True, null=True, editable=False)
     rejected = models.DateField(blank=True, null=True, editable=False)
 
-    @property
-    def handicap(self):
-        return handicap_from_score(self.score, self.shot_round, "AGB", int_prec=True)
+    objects = SubmissionScoreQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["athlete_season", "handicap"],
+                name="subscore_season_handicap_idx",
+            ),
+        ]
+
+    def set_athlete_season(self):
+        if self.athlete_season_id is None:
+            self.athlete_season_id = self.submission.athlete_season_id
+
+    def save(self, *args, **kwargs):
+        self.set_athlete_season()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return "Score submitted for %s - %s on %s at %s" % (
@@ -174,3 +373,155 @@ class ContactResponse(models.Model):
 
     def __str__(self):
         return "Message from {} at {}".format(self.email, self.timestamp)
+
+
+class LastModified(models.Model):
+    """When a kind of data last changed, for HTTP conditional requests."""
+
+    name = models.CharField(max_length=64, unique=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "last modified"
+
+    def __str__(self):
+        return "%s last modified at %s" % (self.name, self.timestamp)
+
+
+class RankingsSnapshot(models.Model):
+    """A pre-rendered copy of every rankings page, see snapshots.publish."""
+
+    version = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    live = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["-created"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["live"],
+                condition=models.Q(live=True),
+                name="snapshot_one_live",
+            ),
+        ]
+
+    def __str__(self):
+        return "Rankings snapshot %s" % self.version
+
+
+class SnapshotPage(models.Model):
+    snapshot = models.ForeignKey(RankingsSnapshot, on_delete=models.CASCADE)
+    path = models.CharField(max_length=256)
+    is_json = models.BooleanField(default=False)
+    # Content-Encoding of the content, blank if uncompressed
+    encoding = models.CharField(max_length=8, blank=True, default="")
+    content = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["snapshot", "path", "is_json", "encoding"],
+                name="snapshot_page_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "%s in %s" % (self.path, self.snapshot)
+
+
+class RegisteredAthlete(models.Model):
+    """A cached AGB lookup result, so imports don't ask the extranet again."""
+
+    agb_number = models.CharField(max_length=256, unique=True)
+    data = models.JSONField(blank=True, null=True, help_text="Empty if not found")
+    fetched = models.DateTimeField()
+
+    def __str__(self):
+        return "AGB lookup for %s" % self.agb_number
+
+
+class Job(models.Model):
+    """A long-running task, queued for the worker process."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    kind = models.CharField(max_length=64)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        default=QUEUED,
+        choices=[
+            (QUEUED, "Queued"),
+            (RUNNING, "Running"),
+            (DONE, "Done"),
+            (FAILED, "Failed"),
+        ],
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    message = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=256, blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(blank=True, null=True)
+    heartbeat = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["status", "created"], name="job_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return "%s job %s (%s)" % (self.kind, self.pk, self.status)
+
+    def set_progress(self, progress, total=None, message=None):
+        self.progress = progress
+        fields = ["progress"]
+        if total is not None:
+            self.total = total
+            fields.append("total")
+        if message is not None:
+            self.message = message
+            fields.append("message")
+        self.save(update_fields=fields)
+
+
+class ImportBatch(models.Model):
+    """An uploaded results file, staged until it is checked and committed."""
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=256)
+    rows = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    committed = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "import batches"
+
+    def __str__(self):
+        return "%s for %s" % (self.filename, self.event)
+
+
+class StagedScore(models.Model):
+    batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE)
+    agb_number = models.CharField(max_length=256)
+    forename = models.CharField(max_length=256, blank=True, default="")
+    surname = models.CharField(max_length=256, blank=True, default="")
+    category = models.CharField(max_length=20)
+    shot_round = models.CharField(max_length=64, blank=True, default="")
+    score = models.PositiveIntegerField()
+    year = models.PositiveIntegerField("Year of Birth", blank=True, null=True)
+    athlete_known = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["batch", "athlete_known", "agb_number"],
+                name="staged_batch_known_idx",
+            ),
+        ]
@@ -0,0 +1,182 @@
+import concurrent.futures
+import contextlib
+import datetime
+import hashlib
+import itertools
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .athlete_registry import get_athlete_details
+from .extranet import (
+    fetch_shoot_return,
+    import_scores,
+    parse_category,
+    parse_shoot_return,
+)
+from .models import Athlete, Event, Score
+
+
+def content_hash(value):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def record_key(record):
+    return "%s|%s" % (record.get("AthID"), record.get("Category"))
+
+
+def events_to_poll():
+    """Events whose results may still appear or change on the extranet.
+
+    That's recent events without any scores, and events whose results changed
+    recently.
+    """
+    today = timezone.localdate()
+    awaiting_results = Q(
+        score__isnull=True,
+        date__lte=today,
+        date__gte=today - datetime.timedelta(days=settings.EXTRANET_POLL_DAYS),
+    )
+    recently_changed = Q(
+        extranet_changed__gte=timezone.now()
+        - datetime.timedelta(days=settings.EXTRANET_POLL_CHANGED_DAYS)
+    )
+    return (
+        Event.objects.exclude(extranet_id="")
+        .filter(awaiting_results | recently_changed)
+        .distinct()
+        .order_by("date")
+    )
+
+
+def changed_records(event, data):
+    """Hash every record, returning the new hashes and the changed records."""
+    hashes = {record_key(record): content_hash(record) for record in data}
+    changed = [
+        record
+        for record in data
+        if event.extranet_records.get(record_key(record)) != hashes[record_key(record)]
+    ]
+    return hashes, changed
+
+
+def unresolved_athletes(entries):
+    """AGB numbers of entries whose athletes can't be found or looked up now."""
+    agb_numbers = {entry["agb_number"] for entry in entries}
+    known = set(
+        Athlete.objects.filter(agb_number__in=agb_numbers).values_list(
+            "agb_number", flat=True
+        )
+    )
+    details = get_athlete_details(agb_numbers - known)
+    return {
+        agb_number for agb_number in agb_numbers - known if not details.get(agb_number)
+    }
+
+
+def delete_removed_scores(event, record_keys):
+    """Delete the scores of records which have gone from the extranet."""
+    removed = Q(pk__in=[])
+    for key in record_keys:
+        agb_number, category = key.split("|", 1)
+        try:
+            entry = parse_category(category)
+        except (IndexError, KeyError):
+            entry = None
+        if entry is not None:
+            removed |= Q(
+                athlete_season__athlete__agb_number=agb_number,
+                athlete_season__bowstyle=entry["bowstyle"],
+            )
+    return Score.objects.filter(removed, event=event).delete()[0]
+
+
+def poll(events, workers=4, session=None):
+    """Fetch results for events and import any records which changed.
+
+    Payloads identical to the last one seen for an event are skipped without
+    writing to the database, as are empty payloads, which the extranet gives
+    before results are published. Scores of records which have gone from the
+    payload are deleted. A record whose athlete can't be found or looked up
+    isn't marked as seen, so it is tried again by the next poll. Returns a list
+    of (event, changed records, new scores) for the events which changed, and
+    a list of (event, exception) for the events which couldn't be fetched.
+    """
+    with contextlib.ExitStack() as stack:
+        if session is None:
+            session = stack.enter_context(requests.Session())
+            adapter = HTTPAdapter(pool_maxsize=workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return _poll(list(events), workers, session)
+
+
+def _poll(events, workers, session):
+    def fetch(event):
+        try:
+            return fetch_shoot_return(event.extranet_id, session=session)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return e
+
+    changed_events = []
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        for event, data in zip(events, executor.map(fetch, events)):
+            if isinstance(data, Exception):
+                failed.append((event, data))
+                continue
+            payload_hash = content_hash(data)
+            if not data or payload_hash == event.extranet_hash:
+                continue
+            hashes, records = changed_records(event, data)
+            changed_events.append((event, payload_hash, hashes, records))
+
+    if not changed_events:
+        return [], failed
+    entries = {
+        event.pk: parse_shoot_return(records)
+        for event, payload_hash, hashes, records in changed_events
+    }
+    # Looked up before the transaction starts, so it isn't held open
+    unresolved = unresolved_athletes(itertools.chain(*entries.values()))
+    now = timezone.now()
+    with transaction.atomic():
+        created = import_scores(
+            [(event, entries[event.pk]) for event, *_ in changed_events],
+            update=True,
+            lookup=False,
+        )
+        for event, payload_hash, hashes, records in changed_events:
+            delete_removed_scores(event, set(event.extranet_records) - set(hashes))
+            retry = {
+                record_key(record)
+                for record in records
+                if record.get("AthID") in unresolved
+            }
+            # Records to try again keep their old hashes, so they still differ
+            for key in retry:
+                del hashes[key]
+                if key in event.extranet_records:
+                    hashes[key] = event.extranet_records[key]
+            if not retry:
+                event.extranet_hash = payload_hash
+            if hashes != event.extranet_records:
+                event.extranet_changed = now
+            event.extranet_records = hashes
+        Event.objects.bulk_update(
+            [event for event, *_ in changed_events],
+            ["extranet_hash", "extranet_records", "extranet_changed"],
+        )
+    changes = [
+        (event, len(records), created[event.pk])
+        for event, payload_hash, hashes, records in changed_events
+    ]
+    return changes, failed
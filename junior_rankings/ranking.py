@@ -0,0 +1,99 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Rank
+
+from archerydjango.fields import DbAges
+
+from . import freshness, snapshots
+from .models import AthleteSeason
+
+# Age groups which get their own rankings
+RANKED_AGE_GROUPS = list(DbAges)[2:]
+
+
+def division_filter(divisions):
+    """Filter athlete seasons to the given (bowstyle, gender) divisions."""
+    query = Q(pk__in=[])
+    for bowstyle, gender in divisions:
+        query |= Q(bowstyle=bowstyle, athlete__gender=gender)
+    return query
+
+
+def ranked_seasons(seasons):
+    """Annotate athlete seasons with their ranks, computed by the database.
+
+    Ranks are standard competition ranks ("1, 2, 2, 4") on aggregate handicap,
+    within each bowstyle and gender, and within each age group of that.
+    """
+    division = [F("bowstyle"), F("athlete__gender")]
+    age_division = division + [F("age_group")]
+    return seasons.filter(agg_handicap__isnull=False).annotate(
+        calculated_overall_rank=Window(
+            Rank(), partition_by=division, order_by=F("agg_handicap").asc()
+        ),
+        overall_ties=Window(Count("pk"), partition_by=division + [F("agg_handicap")]),
+        calculated_age_group_rank=Window(
+            Rank(), partition_by=age_division, order_by=F("agg_handicap").asc()
+        ),
+        age_group_ties=Window(
+            Count("pk"), partition_by=age_division + [F("agg_handicap")]
+        ),
+    )
+
+
+# Ranks from the ranked_seasons query are written with one UPDATE ... FROM,
+# which both PostgreSQL and SQLite support.
+UPDATE_RANKS = """
+UPDATE %(table)s SET
+    overall_rank = ranked.calculated_overall_rank,
+    overall_rank_is_equal = ranked.overall_ties > 1,
+    age_group_rank = CASE WHEN ranked.age_group IN (%(ages)s)
+        THEN ranked.calculated_age_group_rank END,
+    age_group_rank_is_equal = ranked.age_group IN (%(ages)s)
+        AND ranked.age_group_ties > 1
+FROM (%(ranked)s) AS ranked
+WHERE %(table)s.id = ranked.id
+"""
+
+
+def rerank(divisions=None):
+    """Recalculate ranks, for every athlete or just the given divisions.
+
+    Returns the number of ranked athlete seasons.
+    """
+    seasons = AthleteSeason.objects.all()
+    if divisions is not None:
+        seasons = seasons.filter(division_filter(divisions))
+
+    ranked_sql, ranked_params = (
+        ranked_seasons(seasons)
+        .values(
+            "id",
+            "age_group",
+            "calculated_overall_rank",
+            "overall_ties",
+            "calculated_age_group_rank",
+            "age_group_ties",
+        )
+        .query.sql_with_params()
+    )
+    ages = [int(age) for age in RANKED_AGE_GROUPS]
+    sql = UPDATE_RANKS % {
+        "table": connection.ops.quote_name(AthleteSeason._meta.db_table),
+        "ages": ", ".join(["%s"] * len(ages)),
+        "ranked": ranked_sql,
+    }
+
+    with transaction.atomic():
+        seasons.update(
+            overall_rank=None,
+            overall_rank_is_equal=False,
+            age_group_rank=None,
+            age_group_rank_is_equal=False,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, ages + ages + list(ranked_params))
+            ranked = cursor.rowcount
+        freshness.touch(freshness.RANKINGS)
+        transaction.on_commit(snapshots.republish)
+    return ranked
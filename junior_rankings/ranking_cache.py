@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = "rankings:generation"
+
+
+def get_generation():
+    """Return the current ranking generation, which changes on every rerank."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Lost from the cache, so start a generation no cached page can share
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def page_key(path, authenticated):
+    return "rankings:page:%s:%s:%s" % (get_generation(), int(authenticated), path)
+
+
+def get_page(path, authenticated):
+    """Return the cached (content type, content) of a page, or None."""
+    return cache.get(page_key(path, authenticated))
+
+
+def set_page(path, authenticated, response):
+    cache.set(
+        page_key(path, authenticated),
+        (response["Content-Type"], response.content),
+        timeout=settings.RANKINGS_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,86 @@
+import itertools
+
+from archerydjango.fields import DbAges, DbBowstyles, DbGender
+
+from .models import AthleteSeason, age_group_short, rank_display
+
+# Age groups as they appear in rankings URLs, e.g. "16" for U16
+AGE_CODES = [str(age)[-2:] for age in list(DbAges)[2:]]
+
+ROW_FIELDS = [
+    "bowstyle",
+    "athlete__gender",
+    "athlete__forename",
+    "athlete__surname",
+    "age_group",
+    "agg_handicap",
+    "overall_rank",
+    "overall_rank_is_equal",
+    "age_group_rank",
+    "age_group_rank_is_equal",
+]
+
+
+class RankingRow(object):
+    """A row of a rankings table, with just what the template shows."""
+
+    __slots__ = [
+        "name",
+        "age_group_short",
+        "agg_handicap",
+        "overall_rank_display",
+        "age_group_rank_display",
+    ]
+
+    def __init__(self, values):
+        self.name = "%s %s" % (values["athlete__forename"], values["athlete__surname"])
+        self.age_group_short = age_group_short(values["age_group"])
+        self.agg_handicap = values["agg_handicap"]
+        self.overall_rank_display = rank_display(
+            values["overall_rank"], values["overall_rank_is_equal"]
+        )
+        self.age_group_rank_display = rank_display(
+            values["age_group_rank"], values["age_group_rank_is_equal"]
+        )
+
+    def as_dict(self, is_age=False):
+        rank = self.age_group_rank_display if is_age else self.overall_rank_display
+        return {
+            "rank": str(rank),
+            "name": self.name,
+            "age": self.age_group_short,
+            "handicap": self.agg_handicap,
+        }
+
+
+def division_code(bowstyle, gender):
+    return ("%s%s" % (str(bowstyle)[0], str(gender)[0])).lower()
+
+
+def divisions():
+    return itertools.product(DbBowstyles, DbGender)
+
+
+def load_ranking_tables(top=None, bowstyle=None, gender=None, age_group=None):
+    """Load ranked athletes for any number of divisions in a single query.
+
+    Returns a dict of (bowstyle, gender) to a list of rows in ranking order.
+    ``top`` limits each division to athletes ranked that high or better.
+    """
+    seasons = AthleteSeason.objects.filter(overall_rank__isnull=False)
+    if top is not None:
+        seasons = seasons.filter(overall_rank__lte=top)
+    if bowstyle is not None:
+        seasons = seasons.filter(bowstyle=bowstyle)
+    if gender is not None:
+        seasons = seasons.filter(athlete__gender=gender)
+    if age_group is not None:
+        seasons = seasons.filter(age_group=age_group)
+
+    tables = {}
+    for values in seasons.order_by("overall_rank", "athlete__surname").values(
+        *ROW_FIELDS
+    ):
+        division = (values["bowstyle"], values["athlete__gender"])
+        tables.setdefault(division, []).append(RankingRow(values))
+    return tables
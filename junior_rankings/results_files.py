@@ -0,0 +1,152 @@
+import csv
+import io
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+from django.db import transaction
+
+from .extranet import import_scores, parse_category, shot_round
+
+# Column, attribute or element names used by tournament software exports for
+# each field, compared lower case with spaces and underscores removed.
+FIELD_NAMES = {
+    "agb_number": ["agbnumber", "agbno", "athletecode", "code", "membershipnumber"],
+    "category": ["category", "agecategory"],
+    "division": ["division", "bowstyle"],
+    "class": ["class", "ageclass"],
+    "score": ["score", "total", "totalscore"],
+}
+
+FIELD_LOOKUP = {name: field for field, names in FIELD_NAMES.items() for name in names}
+
+
+class ResultsFileError(ValueError):
+    pass
+
+
+def normalise(row):
+    """Pick out the fields we need from a row, whatever the export calls them."""
+    record = {}
+    for key, value in row.items():
+        if key is None:
+            # Cells beyond the header row
+            continue
+        field = FIELD_LOOKUP.get(key.lower().replace(" ", "").replace("_", ""))
+        if field and value is not None and field not in record:
+            record[field] = value.strip()
+    if "category" not in record and "division" in record and "class" in record:
+        record["category"] = record["division"] + record["class"]
+    return record
+
+
+def iter_csv(f):
+    for row in csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig")):
+        yield normalise(row)
+
+
+def iter_xml(f):
+    """Yield a record for each element with an AGB number and a score.
+
+    Fields are read from the element's attributes and child elements.
+    Elements are dropped once read, so large files aren't held in memory.
+    """
+    root = None
+    depth = 0
+    for event, element in ET.iterparse(f, events=["start", "end"]):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        row = dict(element.attrib)
+        row.update((child.tag, child.text or "") for child in element)
+        record = normalise(row)
+        if "score" in record and "agb_number" in record:
+            yield record
+            element.clear()
+        elif len(element):
+            # Leaf elements may be fields of a record that hasn't ended yet
+            element.clear()
+        if depth == 1:
+            root.remove(element)
+
+
+def iter_records(f, filename):
+    if filename.lower().endswith(".xml"):
+        return iter_xml(f)
+    return iter_csv(f)
+
+
+def parse_records(records):
+    """Entries for import_scores, and a count of skipped records by reason."""
+    entries = []
+    skipped = Counter()
+    # An athlete listed twice shot the round twice
+    shot_count = Counter()
+    for record in records:
+        if not record.get("agb_number") or record["agb_number"] == "0":
+            skipped["no AGB number"] += 1
+            continue
+        if not record.get("score", "").isdigit() or record["score"] == "0":
+            skipped["no score"] += 1
+            continue
+        try:
+            entry = parse_category(record.get("category", "").upper())
+        except KeyError:
+            entry = None
+        if entry is None:
+            skipped["unknown category"] += 1
+            continue
+        key = (record["agb_number"], entry["bowstyle"])
+        shot_count[key] += 1
+        entry.update(
+            agb_number=record["agb_number"],
+            scores=[int(record["score"])],
+            round_number=shot_count[key],
+        )
+        entries.append(entry)
+    return entries, skipped
+
+
+def import_results_file(event, f, filename, dry_run=False):
+    """Import a tournament software results export for an event.
+
+    Returns a report: the number of records read and scores created, records
+    skipped by reason, and the round used for each category. A dry run
+    reports on the import without keeping anything, and without looking up
+    athletes who aren't already known.
+    """
+    try:
+        entries, skipped = parse_records(iter_records(f, filename))
+    except (csv.Error, ET.ParseError, UnicodeDecodeError) as e:
+        raise ResultsFileError("Could not read %s: %s" % (filename, e))
+
+    records = len(entries) + sum(skipped.values())
+    rounds = Counter()
+    known = []
+    for entry in entries:
+        try:
+            rounds[(entry["category"], shot_round(event, entry).name)] += 1
+        except (IndexError, KeyError):
+            skipped["unknown category"] += 1
+        else:
+            known.append(entry)
+    entries = known
+
+    if dry_run:
+        with transaction.atomic():
+            created = import_scores([(event, entries)], lookup=False, skipped=skipped)[
+                event.pk
+            ]
+            transaction.set_rollback(True)
+    else:
+        created = import_scores([(event, entries)], skipped=skipped)[event.pk]
+
+    return {
+        "records": records,
+        "created": created,
+        "skipped": dict(skipped),
+        "rounds": sorted(rounds.items()),
+        "dry_run": dry_run,
+    }
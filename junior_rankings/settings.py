@@ -72,6 +72,22 @@ DATABASES = {
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Caching
+# The local memory cache is per process, so a rerank run elsewhere only shows
+# once RANKINGS_CACHE_TIMEOUT passes. Use a shared backend to see it at once.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "junior-rankings"),
+    },
+}
+RANKINGS_CACHE_TIMEOUT = int(os.environ.get("RANKINGS_CACHE_TIMEOUT", 300))
+# How long browsers and any CDN may reuse public pages and API responses
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", 60))
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,6 +127,32 @@ WEBPACK_LOADER = {
 }
 
 AGB_API_TOKEN = os.environ.get("AGB_API_TOKEN", "")
+EXTRANET_SHOOT_RETURN_URL = os.environ.get(
+    "EXTRANET_SHOOT_RETURN_URL",
+    "https://records.agbextranet.org.uk/Public/ShootReturn.php",
+)
+# Days after an event to keep checking for results, and after results change
+# to keep checking for corrections
+EXTRANET_POLL_DAYS = 60
+EXTRANET_POLL_CHANGED_DAYS = 14
+AGB_LOOKUP_URL = os.environ.get(
+    "AGB_LOOKUP_URL", "https://records.agbextranet.org.uk/Public/AGBLookup.php"
+)
+AGB_LOOKUP_WORKERS = int(os.environ.get("AGB_LOOKUP_WORKERS", 8))
+# Seconds to connect and to wait for a response
+AGB_LOOKUP_TIMEOUT = (3.05, 10)
+# Seconds before a looked up athlete is fetched again
+AGB_REGISTRY_TTL = int(os.environ.get("AGB_REGISTRY_TTL", 30 * 24 * 60 * 60))
+
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", 2))
+# Seconds between checks for new jobs when the queue is empty
+JOB_POLL_INTERVAL = 5
+# Seconds between heartbeats from a running job. A job whose worker misses
+# heartbeats for JOB_LEASE_TIMEOUT seconds, e.g. because the dyno was killed,
+# is queued again, up to JOB_MAX_ATTEMPTS runs.
+JOB_HEARTBEAT_INTERVAL = 10
+JOB_LEASE_TIMEOUT = 60
+JOB_MAX_ATTEMPTS = 3
 
 SOURCE_VERSION = os.environ.get("SOURCE_VERSION", "dev")
 
@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http.response import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+import brotli
+
+from . import freshness
+from .models import RankingsSnapshot, SnapshotPage
+from .ranking_tables import AGE_CODES, division_code, divisions
+
+CONTENT_TYPES = {
+    False: "text/html; charset=utf-8",
+    True: "application/json",
+}
+
+# The live snapshot's version, or "" if there isn't one
+LIVE_KEY = "rankings:snapshot:live"
+
+# Preferred first
+ENCODINGS = {
+    "br": brotli.compress,
+    "gzip": lambda content: gzip.compress(content, mtime=0),
+}
+
+
+def rankings_paths():
+    yield reverse("rankings")
+    for bowstyle, gender in divisions():
+        code = division_code(bowstyle, gender)
+        yield reverse("division_rankings", kwargs={"division": code})
+        for age in AGE_CODES:
+            yield reverse(
+                "age_division_rankings", kwargs={"division": code, "age": int(age)}
+            )
+
+
+def render(path):
+    """Render a rankings page for an anonymous visitor, as HTML and JSON."""
+    from .views import Rankings
+
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    match = resolve(path)
+    view = Rankings()
+    view.setup(request, *match.args, **match.kwargs)
+    context = view.get_context_data(**match.kwargs)
+    html = render_to_string(view.template_name, context, request=request)
+    data = json.dumps(view.get_json_data(context), cls=DjangoJSONEncoder)
+    return html.encode(), data.encode()
+
+
+def publish(render=render, keep=3):
+    """Store a new snapshot of every rankings page and make it live.
+
+    Snapshots are kept in the database, so every dyno serves the same one.
+    ``render`` is called with each rankings path and returns the HTML and the
+    JSON for the page, as bytes. Returns the snapshot, which is not made live
+    if ranks changed while it was being rendered.
+    """
+    ranked_at = freshness.last_modified(freshness.RANKINGS)
+    pages = []
+    digest = hashlib.sha256()
+    for path in rankings_paths():
+        for is_json, content in zip([False, True], render(path)):
+            digest.update(b"%s|%d|%s|" % (path.encode(), is_json, content))
+            pages.append(SnapshotPage(path=path, is_json=is_json, content=content))
+            for encoding, compress in ENCODINGS.items():
+                pages.append(
+                    SnapshotPage(
+                        path=path,
+                        is_json=is_json,
+                        encoding=encoding,
+                        content=compress(content),
+                    )
+                )
+
+    with transaction.atomic():
+        snapshot, created = RankingsSnapshot.objects.get_or_create(
+            version=digest.hexdigest()
+        )
+        if created:
+            for page in pages:
+                page.snapshot = snapshot
+            SnapshotPage.objects.bulk_create(pages, batch_size=100)
+        if freshness.last_modified(freshness.RANKINGS) == ranked_at:
+            unpublish()
+            snapshot.live = True
+            snapshot.save(update_fields=["live"])
+            transaction.on_commit(
+                lambda: cache.set(LIVE_KEY, snapshot.version, timeout=None)
+            )
+        prune(keep)
+    return snapshot
+
+
+def unpublish():
+    """Stop serving the live snapshot, e.g. because ranks have changed."""
+    RankingsSnapshot.objects.filter(live=True).update(live=False)
+    transaction.on_commit(lambda: cache.set(LIVE_KEY, "", timeout=None))
+
+
+def live_version():
+    """The live snapshot's version, or "" if there isn't one."""
+    version = cache.get(LIVE_KEY)
+    if version is None:
+        version = (
+            RankingsSnapshot.objects.filter(live=True)
+            .values_list("version", flat=True)
+            .first()
+        ) or ""
+        # Unless publish or unpublish has set it meanwhile
+        if not cache.add(LIVE_KEY, version, timeout=None):
+            version = cache.get(LIVE_KEY, version)
+    return version
+
+
+def get_page(version, path, is_json):
+    """A snapshot page's content by encoding, empty if it has been pruned."""
+    key = "rankings:snapshot:%s:%d:%s" % (version, is_json, path)
+    page = cache.get(key)
+    if page is None:
+        page = {
+            encoding: bytes(content)
+            for encoding, content in SnapshotPage.objects.filter(
+                snapshot__version=version, path=path, is_json=is_json
+            ).values_list("encoding", "content")
+        }
+        cache.set(key, page, timeout=settings.RANKINGS_CACHE_TIMEOUT)
+    return page
+
+
+def republish():
+    """Stop serving the live snapshot, and queue a new one to replace it."""
+    from .jobs import enqueue_once
+
+    unpublish()
+    enqueue_once("publish_rankings")
+
+
+def prune(keep):
+    old = RankingsSnapshot.objects.filter(live=False).order_by("-created")[keep:]
+    RankingsSnapshot.objects.filter(
+        pk__in=list(old.values_list("pk", flat=True))
+    ).delete()
+
+
+def serve(request, is_json):
+    """Return the live snapshot of a rankings page, if there is one.
+
+    Only anonymous visitors are served snapshots, as they are rendered for an
+    anonymous user. Pages are served from the cache, without queries.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+
+    version = live_version()
+    if not version:
+        return None
+    page = get_page(version, request.path, is_json)
+    accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    encoding = next(
+        (name for name in ENCODINGS if name in accepted and name in page), ""
+    )
+    if encoding not in page:
+        return None
+
+    etag = '"%s-%s"' % (version[:32], encoding or "identity")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(page[encoding], content_type=CONTENT_TYPES[is_json])
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding, Cookie"
+    patch_cache_control(response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,179 @@
+import csv
+import io
+import itertools
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .allowed_rounds import all_rounds
+from .athlete_registry import stale_before
+from .extranet import import_scores, parse_category
+from .maintenance import refresh_once
+from .models import Athlete, ImportBatch, RegisteredAthlete, StagedScore
+
+# Columns of an uploaded results file. round is optional, and otherwise comes
+# from the event's rules, as for extranet imports.
+CSV_COLUMNS = ["agb_number", "forename", "surname", "category", "score", "round"]
+
+
+class StagingError(ValueError):
+    """An upload which can't be staged, with an error for each bad row."""
+
+    def __init__(self, errors):
+        self.errors = [errors] if isinstance(errors, str) else errors
+        super().__init__("; ".join(self.errors))
+
+
+def row_errors(row, line):
+    """Problems with a CSV row which would stop its score being imported."""
+    missing = [
+        column
+        for column in CSV_COLUMNS
+        if column != "round" and (row.get(column) or "").strip() == ""
+    ]
+    if missing:
+        return ["Line %s: missing %s" % (line, ", ".join(missing))]
+    errors = []
+    if row.get("round") and row["round"] not in all_rounds:
+        errors.append("Line %s: unknown round %s" % (line, row["round"]))
+    try:
+        parse_category(row["category"].strip())
+    except (IndexError, KeyError):
+        errors.append("Line %s: unknown category %s" % (line, row["category"]))
+    try:
+        if int(row["score"]) < 0:
+            errors.append("Line %s: score %s is negative" % (line, row["score"]))
+    except ValueError:
+        errors.append("Line %s: score %s is not a number" % (line, row["score"]))
+    return errors
+
+
+def stage_csv(event, upload, chunk_size=1000, max_errors=50):
+    """Copy an uploaded CSV into the staging table, a chunk at a time.
+
+    Every row is checked, and if any are bad nothing is staged and a
+    StagingError lists the first ``max_errors`` problems.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding="utf-8-sig"))
+    missing = set(CSV_COLUMNS) - {"round"} - set(reader.fieldnames or [])
+    if missing:
+        raise StagingError("Missing columns: %s" % ", ".join(sorted(missing)))
+
+    errors = []
+    with transaction.atomic():
+        batch = ImportBatch.objects.create(event=event, filename=upload.name)
+        # Line 1 is the header
+        for rows in itertools.batched(enumerate(reader, 2), chunk_size):
+            staged = []
+            for line, row in rows:
+                if row["agb_number"] in ("", "0") or row["score"] in ("", "0"):
+                    continue
+                row_problems = row_errors(row, line)
+                if row_problems:
+                    errors += row_problems
+                    continue
+                staged.append(
+                    StagedScore(
+                        batch=batch,
+                        agb_number=row["agb_number"].strip(),
+                        forename=row["forename"].strip(),
+                        surname=row["surname"].strip(),
+                        category=row["category"].strip(),
+                        shot_round=row.get("round") or "",
+                        score=int(row["score"]),
+                    )
+                )
+            if errors:
+                if len(errors) >= max_errors:
+                    break
+                continue
+            StagedScore.objects.bulk_create(staged)
+            batch.rows += len(staged)
+        if errors:
+            # Rolls back the batch
+            raise StagingError(errors[:max_errors])
+
+        batch.save(update_fields=["rows"])
+        staged = batch.stagedscore_set
+        staged.filter(agb_number__in=Athlete.objects.values("agb_number")).update(
+            athlete_known=True
+        )
+        staged.filter(
+            agb_number__in=RegisteredAthlete.objects.filter(
+                data__isnull=False, fetched__gte=stale_before()
+            ).values("agb_number")
+        ).update(athlete_known=True)
+    return batch
+
+
+def unknown_athletes(batch):
+    """Athletes in the batch who aren't held here, one row per AGB number."""
+    return (
+        batch.stagedscore_set.filter(athlete_known=False)
+        .values("agb_number")
+        .annotate(forename=Min("forename"), surname=Min("surname"), year=Max("year"))
+        .order_by("surname", "forename", "agb_number")
+    )
+
+
+def set_years(batch, years):
+    """Record years of birth given for unknown athletes, by AGB number."""
+    with transaction.atomic():
+        for agb_number, year in years.items():
+            batch.stagedscore_set.filter(agb_number=agb_number).update(year=year)
+
+
+def staged_entries(staged_scores):
+    """Entries for import_scores from staged rows, with given athlete details."""
+    # The same athlete twice is a double round
+    shot_count = Counter()
+    entries = []
+    details = {}
+    for staged in staged_scores:
+        entry = parse_category(staged.category)
+        if entry is None:
+            continue
+        key = (staged.agb_number, entry["bowstyle"])
+        shot_count[key] += 1
+        entry.update(
+            agb_number=staged.agb_number,
+            scores=[staged.score],
+            round_number=shot_count[key],
+        )
+        if staged.shot_round:
+            entry["shot_round"] = all_rounds[staged.shot_round]
+        entries.append(entry)
+        if staged.year:
+            details[staged.agb_number] = {
+                "forename": staged.forename,
+                "surname": staged.surname,
+                "year": staged.year,
+            }
+    return entries, details
+
+
+def commit(batch, chunk_size=2000):
+    """Import the staged scores, returning the number of scores created.
+
+    Athletes are chunked whole, so double rounds are numbered in one go.
+    """
+    agb_numbers = list(
+        batch.stagedscore_set.order_by("agb_number")
+        .values_list("agb_number", flat=True)
+        .distinct()
+    )
+    created = 0
+    with refresh_once():
+        for chunk in itertools.batched(agb_numbers, chunk_size):
+            entries, details = staged_entries(
+                batch.stagedscore_set.filter(agb_number__in=chunk).order_by("pk")
+            )
+            created += import_scores([(batch.event, entries)], details=details)[
+                batch.event.pk
+            ]
+    batch.committed = timezone.now()
+    batch.save(update_fields=["committed"])
+    batch.stagedscore_set.all().delete()
+    return created
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from junior_rankings import agb_lookup
+from junior_rankings.agb_lookup import (
+    AthleteLookupClient,
+    AthleteLookupError,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from junior_rankings.athlete_registry import get_athlete_details, refresh
+from junior_rankings.models import RegisteredAthlete
+
+from .utils import StubServer
+
+
+def extranet(params):
+    agb_number = params["agbno"]
+    if agb_number.startswith("5"):
+        return 400, {}
+    if agb_number.startswith("4"):
+        return 200, {"results": []}
+    return 200, {"results": [{"full_name": "Archer %s" % agb_number, "YOB": "2010"}]}
+
+
+class AthleteLookupClientTests(TestCase):
+    def setUp(self):
+        self.server = StubServer(extranet).__enter__()
+        self.addCleanup(self.server.__exit__)
+        breaker = mock.patch.object(agb_lookup, "circuit_breaker", CircuitBreaker())
+        breaker.start()
+        self.addCleanup(breaker.stop)
+
+    def lookup_client(self, **kwargs):
+        return AthleteLookupClient(url=self.server.url, token="", retries=0, **kwargs)
+
+    def test_lookup_many_keeps_results_when_some_fail(self):
+        with self.lookup_client() as client:
+            results, errors = client.lookup_many(["1001", "4001", "5001"])
+        self.assertEqual(
+            results, {"1001": {"full_name": "Archer 1001", "YOB": "2010"}, "4001": None}
+        )
+        self.assertEqual(list(errors), ["5001"])
+        self.assertIsInstance(errors["5001"], AthleteLookupError)
+
+    def test_breaker_is_shared_between_clients(self):
+        for i in range(agb_lookup.circuit_breaker.failure_threshold):
+            with self.lookup_client() as client:
+                with self.assertRaises(AthleteLookupError):
+                    client.lookup("500%s" % i)
+        requests = len(self.server.requests)
+        with self.lookup_client() as client:
+            with self.assertRaises(CircuitOpenError):
+                client.lookup("1001")
+        self.assertEqual(len(self.server.requests), requests)
+
+    def test_refresh_stores_only_successful_lookups(self):
+        with override_settings(AGB_LOOKUP_URL=self.server.url):
+            results, errors = refresh(["1001", "4001", "5001"])
+        self.assertEqual(set(results), {"1001", "4001"})
+        self.assertEqual(set(errors), {"5001"})
+        self.assertEqual(
+            dict(RegisteredAthlete.objects.values_list("agb_number", "data")),
+            {"1001": {"full_name": "Archer 1001", "YOB": "2010"}, "4001": None},
+        )
+
+    def test_refresh_closes_its_client(self):
+        with (
+            override_settings(AGB_LOOKUP_URL=self.server.url),
+            mock.patch.object(AthleteLookupClient, "close", autospec=True) as close,
+        ):
+            refresh(["1001"])
+        close.assert_called_once()
+
+    def test_get_athlete_details_leaves_out_failed_lookups(self):
+        with override_settings(AGB_LOOKUP_URL=self.server.url):
+            details = get_athlete_details(["1001", "4001", "5001"])
+        self.assertIn("1001", details)
+        self.assertIsNone(details["4001"])
+        self.assertNotIn("5001", details)
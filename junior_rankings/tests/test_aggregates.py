@@ -0,0 +1,50 @@
+import io
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+import numpy as np
+from junior_rankings.aggregates import aggregate_handicaps
+from junior_rankings.models import AthleteSeason, Score
+
+from .utils import make_athlete_season, make_event
+
+
+class AggregateHandicapsTests(SimpleTestCase):
+    def test_best_three(self):
+        ids = np.array([2, 1, 1, 2, 1, 1, 2, 3, 3], dtype=np.int64)
+        handicaps = np.array([30, 20, 10, 40, np.nan, 15, 35, 5, 5], dtype=float)
+        # Athlete season 3 has too few scores, and NaN handicaps don't count
+        self.assertEqual(aggregate_handicaps(ids, handicaps), {1: 45, 2: 105})
+
+    def test_no_scores(self):
+        self.assertEqual(
+            aggregate_handicaps(np.array([], dtype=np.int64), np.array([])), {}
+        )
+
+
+class UpdateHcsTests(TestCase):
+    def test_agb_number_filter(self):
+        event = make_event("e1")
+        for agb_number in ["1001", "1002"]:
+            athlete_season = make_athlete_season(agb_number)
+            # on_commit callbacks don't run in tests, so only the command
+            # recalculates aggregates
+            Score.objects.bulk_create(
+                Score(
+                    athlete_season=athlete_season,
+                    event=event,
+                    shot_round="wa720_50_c",
+                    score=600,
+                    round_number=round_number,
+                )
+                for round_number in range(1, 4)
+            )
+        call_command("update_hcs", "1001", stdout=io.StringIO())
+        handicap = Score.objects.values_list("handicap", flat=True).first()
+        self.assertEqual(
+            dict(
+                AthleteSeason.objects.values_list("athlete__agb_number", "agg_handicap")
+            ),
+            {"1001": handicap * 3, "1002": None},
+        )
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from archerydjango.fields import DbBowstyles, DbGender
+from junior_rankings.allowed_rounds import all_rounds
+from junior_rankings.extranet import import_scores
+from junior_rankings.models import Athlete, AthleteSeason, Score
+
+from .utils import make_event, make_season
+
+
+class ImportScoresTests(TestCase):
+    def setUp(self):
+        make_season()
+        self.event = make_event("e1")
+        self.details = {
+            "1001": {"forename": "A", "surname": "Archer", "year": 2010},
+            "1002": {"forename": "B", "surname": "Archer", "year": 2010},
+        }
+
+    def entry(self, agb_number, round_codename, score=600):
+        return {
+            "agb_number": agb_number,
+            "gender": DbGender.MALE,
+            "bowstyle": DbBowstyles.COMPOUND,
+            "shot_round": all_rounds[round_codename],
+            "scores": [score],
+        }
+
+    def import_event(self, count, score=600, update=False, first=2001):
+        """Import a score each for ``count`` new athletes, counting the queries."""
+        details = {
+            str(first + i): {"forename": "A", "surname": "Archer", "year": 2010}
+            for i in range(count)
+        }
+        entries = [self.entry(agb, "wa720_50_c", score) for agb in details]
+        with CaptureQueriesContext(connection) as queries:
+            created = import_scores(
+                [(self.event, entries)], details=details, update=update
+            )
+        return created[self.event.pk], len(queries)
+
+    def test_queries_do_not_grow_with_entries(self):
+        created, few = self.import_event(2)
+        self.assertEqual(created, 2)
+        created, many = self.import_event(20, first=3001)
+        self.assertEqual(created, 20)
+        self.assertEqual(many, few)
+        self.assertEqual(AthleteSeason.objects.count(), 22)
+
+    def test_reimport_leaves_scores_alone(self):
+        self.import_event(3)
+        created, _ = self.import_event(3, score=650)
+        self.assertEqual(created, 0)
+        self.assertEqual(set(Score.objects.values_list("score", flat=True)), {600})
+
+    def test_update_replaces_scores(self):
+        self.import_event(3)
+        created, _ = self.import_event(3, score=650, update=True)
+        self.assertEqual(created, 0)
+        self.assertEqual(set(Score.objects.values_list("score", flat=True)), {650})
+
+    def test_disallowed_round_creates_nothing(self):
+        created = import_scores(
+            [
+                (
+                    self.event,
+                    [
+                        self.entry("1001", "wa720_50_c"),
+                        self.entry("1002", "wa720_70"),
+                    ],
+                )
+            ],
+            details=self.details,
+        )
+        self.assertEqual(created, {self.event.pk: 1})
+        self.assertEqual(
+            list(Athlete.objects.values_list("agb_number", flat=True)), ["1001"]
+        )
+        self.assertEqual(AthleteSeason.objects.get().athlete.agb_number, "1001")
+        self.assertEqual(Score.objects.get().athlete_season.athlete.agb_number, "1001")
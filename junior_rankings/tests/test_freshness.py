@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from junior_rankings import freshness
+from junior_rankings.models import Score
+
+from .utils import make_athlete_season, make_event
+
+
+class FreshnessTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.touch(freshness.RANKINGS)
+
+    def touch(self, *names):
+        with self.captureOnCommitCallbacks(execute=True):
+            freshness.touch(*names)
+
+
+class ConditionalTests(FreshnessTestCase):
+    def test_rankings_vary_on_cookie(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+        anonymous_etag = response["ETag"]
+
+        user = get_user_model().objects.create_user("verifier", password="x")
+        self.client.force_login(user)
+        response = self.client.get("/")
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+        self.assertNotEqual(response["ETag"], anonymous_etag)
+
+    def test_cached_rankings_page_makes_no_queries(self):
+        self.client.get("/rankings/cm/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/rankings/cm/")
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(
+                "/rankings/cm/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+            self.assertEqual(response.status_code, 304)
+
+    def test_rerank_changes_etag(self):
+        etag = self.client.get("/rankings/cm/")["ETag"]
+        self.touch(freshness.RANKINGS)
+        response = self.client.get("/rankings/cm/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_athlete_scores_change_with_events(self):
+        athlete_season = make_athlete_season("1001")
+        event = make_event("e1")
+        Score.objects.create(
+            athlete_season=athlete_season,
+            event=event,
+            shot_round="wa720_50_c",
+            score=600,
+        )
+        self.touch(freshness.SCORES)
+        etag = self.client.get("/api/athlete-scores/", {"agb_number": "1001"})["ETag"]
+        self.touch(freshness.EVENTS)
+        response = self.client.get(
+            "/api/athlete-scores/", {"agb_number": "1001"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_errors_not_cached(self):
+        response = self.client.get("/api/athlete-scores/", {"agb_number": "404"})
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("public", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_athlete_scores_change_with_scores(self):
+        athlete_season = make_athlete_season("1001")
+        event = make_event("e1")
+        etag = self.client.get("/api/athlete-scores/", {"agb_number": "1001"})["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.bulk_create(
+                [
+                    Score(
+                        athlete_season=athlete_season,
+                        event=event,
+                        shot_round="wa720_50_c",
+                        score=600,
+                    )
+                ]
+            )
+        response = self.client.get(
+            "/api/athlete-scores/", {"agb_number": "1001"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.filter(athlete_season=athlete_season).delete()
+        response = self.client.get(
+            "/api/athlete-scores/", {"agb_number": "1001"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class TouchTests(FreshnessTestCase):
+    def test_written_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                freshness.touch(freshness.EVENTS)
+                freshness.touch(freshness.EVENTS)
+                make_event("e1")
+        old = freshness.last_modified(freshness.EVENTS)
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertNotEqual(freshness.last_modified(freshness.EVENTS), old)
+
+    def test_read_from_database_once(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            timestamp = freshness.last_modified(freshness.RANKINGS)
+            self.assertIsNotNone(timestamp)
+            self.assertEqual(freshness.last_modified(freshness.RANKINGS), timestamp)
@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+class HandicapBatchTests(SimpleTestCase):
+    def post(self, data):
+        return self.client.post(
+            "/api/handicap-batch/", json.dumps(data), content_type="application/json"
+        )
+
+    def test_scores(self):
+        response = self.post({"scores": [{"round": "wa720_50_c", "score": 600}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("handicap", response.json()["handicaps"][0])
+
+    def test_invalid_shape(self):
+        for scores in [{"round": "wa720_50_c"}, "600", ["600"], [None]]:
+            with self.subTest(scores=scores):
+                self.assertEqual(self.post({"scores": scores}).status_code, 400)
+
+
+class RoundHandicapsTests(SimpleTestCase):
+    def test_versioned_table_is_immutable(self):
+        response = self.client.get(
+            "/api/handicap-table/wa720_50_c/", {"v": settings.SOURCE_VERSION}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_unversioned_table_is_not_immutable(self):
+        response = self.client.get("/api/handicap-table/wa720_50_c/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    def test_errors_are_not_cached(self):
+        response = self.client.get("/api/handicap-table/nope/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("Cache-Control"))
+        response = self.client.get("/api/handicap/", {"round": "nope", "score": 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("Cache-Control"))
@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from archeryutils.handicaps import handicap_from_score
+from junior_rankings.allowed_rounds import all_available_rounds
+from junior_rankings.handicap_tables import HANDICAP_SYSTEM, get_handicap_table
+
+
+class HandicapTableTests(SimpleTestCase):
+    def test_matches_solver(self):
+        for codename in ["wa720_50_c", "metric_122_40", "wa1440_90"]:
+            rnd = all_available_rounds[codename]
+            table = get_handicap_table(codename)
+            scores = list(range(1, table.max_score, 37)) + [table.max_score]
+            for score in scores:
+                with self.subTest(round=codename, score=score):
+                    self.assertEqual(
+                        table.handicap(score),
+                        handicap_from_score(score, rnd, HANDICAP_SYSTEM, int_prec=True),
+                    )
+
+    def test_invalid_scores(self):
+        table = get_handicap_table("wa720_50_c")
+        self.assertEqual(table.max_score, 720)
+        for score in [0, -1, 721]:
+            with self.subTest(score=score):
+                self.assertFalse(table.is_valid_score(score))
+                with self.assertRaises(ValueError):
+                    table.handicap(score)
+
+    def test_tables_are_shared(self):
+        rnd = all_available_rounds["wa720_50_c"]
+        self.assertIs(get_handicap_table(rnd), get_handicap_table("wa720_50_c"))
+
+    def test_handicap_api(self):
+        response = self.client.get(
+            "/api/handicap/", {"round": "wa720_50_c", "score": "600"}
+        )
+        self.assertEqual(
+            response.json(),
+            {"handicap": get_handicap_table("wa720_50_c").handicap(600)},
+        )
+        response = self.client.get(
+            "/api/handicap/", {"round": "wa720_50_c", "score": "721"}
+        )
+        self.assertEqual(response.status_code, 400)
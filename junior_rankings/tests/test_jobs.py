@@ -0,0 +1,48 @@
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from junior_rankings import jobs
+from junior_rankings.models import Job
+
+
+@override_settings(JOB_LEASE_TIMEOUT=60, JOB_MAX_ATTEMPTS=2)
+class LeaseTests(TestCase):
+    def claim(self):
+        job = jobs.claim("worker")
+        self.assertIsNotNone(job)
+        return job
+
+    def miss_heartbeats(self, job):
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now() - datetime.timedelta(seconds=61)
+        )
+
+    def test_stale_job_is_run_again(self):
+        job = jobs.enqueue("rerank")
+        self.miss_heartbeats(self.claim())
+        retry = self.claim()
+        self.assertEqual((retry.pk, retry.attempts), (job.pk, 2))
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job = jobs.enqueue("rerank")
+        self.miss_heartbeats(self.claim())
+        self.miss_heartbeats(self.claim())
+        self.assertIsNone(jobs.claim("worker"))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_live_job_is_left_running(self):
+        jobs.enqueue("rerank")
+        self.claim()
+        self.assertIsNone(jobs.claim("worker"))
+
+    def test_abandoned_run_does_not_finish_job(self):
+        jobs.enqueue("rerank")
+        abandoned = self.claim()
+        self.miss_heartbeats(abandoned)
+        retry = self.claim()
+        jobs.run(abandoned)
+        self.assertEqual(Job.objects.get(pk=retry.pk).status, Job.RUNNING)
+        jobs.run(retry)
+        self.assertEqual(Job.objects.get(pk=retry.pk).status, Job.DONE)
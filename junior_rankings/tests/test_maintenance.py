@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from junior_rankings import maintenance
+from junior_rankings.maintenance import refresh_once
+from junior_rankings.models import Job, Score
+
+from .utils import make_athlete_season, make_event
+
+
+class RefreshTestMixin(object):
+    def setUp(self):
+        self.seasons = [make_athlete_season(str(1001 + i)) for i in range(3)]
+        self.event = make_event("e1")
+        patcher = mock.patch.object(maintenance, "refresh_athlete_seasons")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_score(self, athlete_season, score=600):
+        return Score.objects.create(
+            athlete_season=athlete_season,
+            event=self.event,
+            shot_round="wa720_50_c",
+            score=score,
+        )
+
+    def queued_ids(self):
+        return [
+            job.params["athlete_season_ids"]
+            for job in Job.objects.filter(kind="refresh_athlete_seasons")
+        ]
+
+
+class RefreshOnCommitTests(RefreshTestMixin, TestCase):
+    def test_transaction_is_refreshed_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.add_score(self.seasons[0])
+                self.add_score(self.seasons[1])
+        self.refresh.assert_called_once_with({s.pk for s in self.seasons[:2]})
+
+    def test_savepoint_rollback_keeps_other_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        self.add_score(self.seasons[0])
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.add_score(self.seasons[1])
+                with transaction.atomic():
+                    self.add_score(self.seasons[2])
+        # The rolled back change is recalculated too, which does no harm
+        self.refresh.assert_called_once_with({s.pk for s in self.seasons})
+
+    def test_changes_in_rolled_back_savepoint_are_refreshed_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.add_score(self.seasons[0])
+                try:
+                    with transaction.atomic():
+                        self.add_score(self.seasons[1])
+                        raise ValueError
+                except ValueError:
+                    pass
+        self.refresh.assert_called_once_with({s.pk for s in self.seasons[:2]})
+
+    def test_failed_refresh_is_queued(self):
+        self.refresh.side_effect = Exception("Deadlock")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.add_score(self.seasons[0])
+        self.assertEqual(self.queued_ids(), [[self.seasons[0].pk]])
+
+
+class RefreshOutsideTransactionTests(RefreshTestMixin, TransactionTestCase):
+    def test_saves_are_collected_in_one_job(self):
+        self.add_score(self.seasons[0])
+        self.add_score(self.seasons[1])
+        self.refresh.assert_not_called()
+        self.assertEqual(self.queued_ids(), [sorted(s.pk for s in self.seasons[:2])])
+
+    def test_refresh_once(self):
+        with refresh_once():
+            self.add_score(self.seasons[0])
+            with transaction.atomic():
+                self.add_score(self.seasons[1])
+        self.refresh.assert_called_once_with({s.pk for s in self.seasons[:2]})
+        self.assertEqual(self.queued_ids(), [])
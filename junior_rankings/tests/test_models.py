@@ -0,0 +1,70 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from junior_rankings.aggregates import update_agg_handicaps
+from junior_rankings.handicap_tables import get_handicap_table
+from junior_rankings.models import AthleteSeason, Score, Submission, SubmissionScore
+
+from .utils import make_athlete_season, make_event
+
+
+class HandicapTests(TestCase):
+    def setUp(self):
+        self.athlete_season = make_athlete_season("1001")
+        self.event = make_event("e1")
+        self.table = get_handicap_table("wa720_50_c")
+
+    def test_update_recalculates_handicap(self):
+        score = Score.objects.create(
+            athlete_season=self.athlete_season,
+            event=self.event,
+            shot_round="wa720_50_c",
+            score=600,
+        )
+        self.assertEqual(Score.objects.filter(pk=score.pk).update(score=650), 1)
+        score.refresh_from_db()
+        self.assertEqual(score.handicap, self.table.handicap(650))
+
+    def test_backfill_updates_aggregates(self):
+        for round_number, score in enumerate([600, 610, 620], 1):
+            Score.objects.create(
+                athlete_season=self.athlete_season,
+                event=self.event,
+                shot_round="wa720_50_c",
+                score=score,
+                round_number=round_number,
+            )
+        # A stale handicap, as from an old handicap table
+        Score._base_manager.filter(score=600).update(handicap=0)
+        seasons = AthleteSeason.objects.filter(pk=self.athlete_season.pk)
+        update_agg_handicaps(seasons)
+        stale = seasons.get().agg_handicap
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("backfill_handicaps", "--all", stdout=io.StringIO())
+        self.assertEqual(
+            seasons.get().agg_handicap,
+            sum(self.table.handicap(score) for score in [600, 610, 620]),
+        )
+        self.assertNotEqual(seasons.get().agg_handicap, stale)
+
+    def test_submission_score_copies_athlete_season(self):
+        submission = Submission.objects.create(athlete_season=self.athlete_season)
+        created = SubmissionScore.objects.create(
+            submission=submission, event=self.event, shot_round="wa720_50_c", score=600
+        )
+        [bulk_created] = SubmissionScore.objects.bulk_create(
+            [
+                SubmissionScore(
+                    submission=submission,
+                    event=self.event,
+                    shot_round="wa720_50_c",
+                    score=610,
+                )
+            ]
+        )
+        for submission_score in [created, bulk_created]:
+            self.assertEqual(submission_score.athlete_season, self.athlete_season)
+            self.assertIsNotNone(submission_score.handicap)
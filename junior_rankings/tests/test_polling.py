@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from junior_rankings import agb_lookup
+from junior_rankings.models import Event, Score
+from junior_rankings.polling import poll
+
+from .utils import StubServer, make_athlete_season, make_event
+
+
+class PollTests(TestCase):
+    def setUp(self):
+        self.payload = []
+        self.failing = {"5001"}
+        server = StubServer(self.extranet).__enter__()
+        self.addCleanup(server.__exit__)
+        urls = override_settings(
+            AGB_LOOKUP_URL=server.url, EXTRANET_SHOOT_RETURN_URL=server.url
+        )
+        urls.enable()
+        self.addCleanup(urls.disable)
+        breaker = mock.patch.object(
+            agb_lookup, "circuit_breaker", agb_lookup.CircuitBreaker()
+        )
+        breaker.start()
+        self.addCleanup(breaker.stop)
+        make_athlete_season("1001")
+        self.event = make_event("e1")
+        self.event.extranet_id = "SHOOT1"
+        self.event.save()
+
+    def extranet(self, params):
+        if "SHOOTCODE" in params:
+            return 200, {"value": self.payload}
+        if params["agbno"] in self.failing:
+            return 400, {}
+        return 200, {
+            "results": [{"full_name": "New Archer", "YOB": "2010"}],
+        }
+
+    def record(self, agb_number, score="600"):
+        return {"AthID": agb_number, "Category": "CU18M", "Score": score}
+
+    def poll(self):
+        changes, failed = poll([Event.objects.get(pk=self.event.pk)], workers=1)
+        self.assertEqual(failed, [])
+        return changes
+
+    def scores(self):
+        return sorted(
+            Score.objects.values_list("athlete_season__athlete__agb_number", "score")
+        )
+
+    def test_failed_lookup_is_tried_again(self):
+        self.payload = [self.record("1001"), self.record("5001")]
+        self.poll()
+        self.assertEqual(self.scores(), [("1001", 600)])
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(list(event.extranet_records), ["1001|CU18M"])
+
+        self.failing = set()
+        self.assertEqual(self.poll()[0][1:], (1, 1))
+        self.assertEqual(self.scores(), [("1001", 600), ("5001", 600)])
+        self.assertEqual(self.poll(), [])
+
+    def test_empty_payload_is_not_a_change(self):
+        self.assertEqual(self.poll(), [])
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertIsNone(event.extranet_changed)
+        self.assertEqual(event.extranet_hash, "")
+
+    def test_removed_record_is_deleted(self):
+        self.payload = [self.record("1001"), self.record("2001")]
+        self.poll()
+        self.assertEqual(self.scores(), [("1001", 600), ("2001", 600)])
+        self.payload = [self.record("1001", "610")]
+        self.poll()
+        self.assertEqual(self.scores(), [("1001", 610)])
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(list(event.extranet_records), ["1001|CU18M"])
@@ -0,0 +1,125 @@
+import itertools
+import random
+
+from django.test import TestCase
+
+from archerydjango.fields import DbAges, DbBowstyles, DbGender
+from junior_rankings.models import AthleteSeason
+from junior_rankings.ranking import rerank
+
+from .utils import make_athlete_season
+
+RANK_FIELDS = [
+    "overall_rank",
+    "overall_rank_is_equal",
+    "age_group_rank",
+    "age_group_rank_is_equal",
+]
+
+
+def rank_per_row():
+    """The original rerank command, which ranks one athlete season at a time."""
+    for bow, gender in itertools.product(DbBowstyles, DbGender):
+        seasons = AthleteSeason.objects.filter(
+            bowstyle=bow, athlete__gender=gender, agg_handicap__isnull=False
+        ).order_by("agg_handicap")
+        current_rank = 0
+        current_hc = None
+        prev = None
+        skip = 0
+        for season in seasons:
+            if season.agg_handicap != current_hc:
+                current_rank = current_rank + 1 + skip
+                current_hc = season.agg_handicap
+                skip = 0
+            else:
+                season.overall_rank_is_equal = True
+                prev.overall_rank_is_equal = True
+                prev.save()
+                skip += 1
+            season.overall_rank = current_rank
+            season.save()
+            prev = season
+
+    for bow, age, gender in itertools.product(DbBowstyles, list(DbAges)[2:], DbGender):
+        seasons = AthleteSeason.objects.filter(
+            bowstyle=bow,
+            age_group=age,
+            athlete__gender=gender,
+            agg_handicap__isnull=False,
+        ).order_by("agg_handicap")
+        current_rank = 0
+        current_hc = None
+        prev = None
+        skip = 0
+        for season in seasons:
+            if season.agg_handicap != current_hc:
+                current_rank = current_rank + 1 + skip
+                current_hc = season.agg_handicap
+                skip = 0
+            else:
+                season.age_group_rank_is_equal = True
+                prev.age_group_rank_is_equal = True
+                prev.save()
+                skip += 1
+            season.age_group_rank = current_rank
+            season.save()
+            prev = season
+
+
+class RerankTests(TestCase):
+    def setUp(self):
+        rng = random.Random(2025)
+        ages = list(DbAges)[1:]
+        for n in range(400):
+            season = make_athlete_season(
+                str(1000 + n),
+                gender=rng.choice(list(DbGender)),
+                age_group=rng.choice(ages),
+                bowstyle=rng.choice(list(DbBowstyles)),
+            )
+            # A narrow range of handicaps, so there are plenty of ties
+            if rng.random() > 0.1:
+                season.agg_handicap = rng.randint(60, 110)
+                season.save(update_fields=["agg_handicap"])
+
+    def ranks(self):
+        return list(
+            AthleteSeason.objects.order_by("pk").values_list("pk", *RANK_FIELDS)
+        )
+
+    def test_matches_per_row_ranking(self):
+        rank_per_row()
+        expected = self.ranks()
+        AthleteSeason.objects.update(
+            overall_rank=None,
+            overall_rank_is_equal=False,
+            age_group_rank=None,
+            age_group_rank_is_equal=False,
+        )
+
+        ranked = rerank()
+
+        self.assertEqual(self.ranks(), expected)
+        self.assertEqual(
+            ranked, AthleteSeason.objects.filter(agg_handicap__isnull=False).count()
+        )
+        self.assertTrue(
+            AthleteSeason.objects.filter(overall_rank_is_equal=True).exists()
+        )
+        self.assertTrue(
+            AthleteSeason.objects.filter(age_group_rank_is_equal=True).exists()
+        )
+
+    def test_division(self):
+        rank_per_row()
+        expected = self.ranks()
+        division = (DbBowstyles.RECURVE, DbGender.FEMALE)
+        seasons = AthleteSeason.objects.filter(
+            bowstyle=division[0], athlete__gender=division[1]
+        )
+        seasons.update(overall_rank=None, age_group_rank=None)
+
+        rerank([division])
+
+        self.assertEqual(self.ranks(), expected)
@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from archerydjango.fields import DbAges
+from junior_rankings.aggregates import update_agg_handicaps
+from junior_rankings.exports import HEADER
+from junior_rankings.handicap_tables import get_handicap_table
+from junior_rankings.models import Athlete, AthleteSeason, Score
+from junior_rankings.ranking import rerank
+from junior_rankings.ranking_tables import ROW_FIELDS, RankingRow
+
+from .utils import make_athlete_season, make_event
+
+
+class RankingsListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def make_ranked(self, agb_number, surname, rank, age_group=DbAges.AGE_UNDER_18):
+        athlete_season = make_athlete_season(agb_number, age_group=age_group)
+        Athlete.objects.filter(pk=athlete_season.athlete_id).update(surname=surname)
+        AthleteSeason.objects.filter(pk=athlete_season.pk).update(
+            overall_rank=rank,
+            age_group_rank=rank if age_group == DbAges.AGE_UNDER_18 else None,
+        )
+        return athlete_season
+
+    def page_through(self, **params):
+        """Names on each page, following the ``next`` cursor to the end."""
+        pages = []
+        while True:
+            response = self.client.get("/api/rankings/", params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([row["name"].split()[1] for row in data["results"]])
+            if data["next"] is None:
+                return pages
+            params["after"] = data["next"]
+
+    def test_pages(self):
+        for agb_number, surname, rank in [
+            ("1001", "Archer", 1),
+            ("1002", "Bowman", 2),
+            ("1003", "Arrow", 2),
+            ("1004", "Fletcher", 4),
+            ("1005", "Arrow", 2),
+        ]:
+            self.make_ranked(agb_number, surname, rank)
+        # Ties on rank are ordered by surname, then id, across page boundaries
+        self.assertEqual(
+            self.page_through(limit=2),
+            [["Archer", "Arrow"], ["Arrow", "Bowman"], ["Fletcher"]],
+        )
+        self.assertEqual(
+            self.page_through(limit=5),
+            [["Archer", "Arrow", "Arrow", "Bowman", "Fletcher"]],
+        )
+
+    def test_unranked_age_group(self):
+        for agb_number, surname, rank in [
+            ("1001", "Bowman", 1),
+            ("1002", "Archer", 2),
+            ("1003", "Archer", 3),
+            ("1004", "Fletcher", 4),
+        ]:
+            self.make_ranked(agb_number, surname, rank, age_group=DbAges.AGE_UNDER_21)
+        self.make_ranked("1005", "Arrow", 5)
+        self.assertEqual(
+            self.page_through(age="u21", limit=1),
+            [["Archer"], ["Archer"], ["Bowman"], ["Fletcher"]],
+        )
+
+    def test_unranked_sort_last(self):
+        self.make_ranked("1001", "Bowman", 2)
+        AthleteSeason.objects.filter(athlete__agb_number="1001").update(
+            age_group_rank=None
+        )
+        self.make_ranked("1002", "Archer", 1)
+        self.make_ranked("1003", "Fletcher", 3)
+        self.assertEqual(
+            self.page_through(age="u18", limit=1),
+            [["Archer"], ["Fletcher"], ["Bowman"]],
+        )
+
+    def test_stream(self):
+        self.make_ranked("1001", "Bowman", 2)
+        self.make_ranked("1002", "Archer", 1)
+        response = self.client.get("/api/rankings/", {"stream": "1", "limit": "1"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(
+            [(row["name"], row["rank"]) for row in rows],
+            [("Forename1002 Archer", 1), ("Forename1001 Bowman", 2)],
+        )
+
+    def test_invalid_after(self):
+        response = self.client.get("/api/rankings/", {"after": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_season(self):
+        response = self.client.get("/api/rankings/", {"season": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid parameter: season"})
+
+
+class RankingsExportTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            "staff", password="x", is_staff=True
+        )
+        self.client.force_login(user)
+
+    def test_export(self):
+        event = make_event("e1")
+        scores = {"1001": [600, 500, 620, 610], "1002": [550, 560, 570], "1003": [600]}
+        for agb_number, values in scores.items():
+            athlete_season = make_athlete_season(agb_number)
+            Score.objects.bulk_create(
+                Score(
+                    athlete_season=athlete_season,
+                    event=event,
+                    shot_round="wa720_50_c",
+                    score=score,
+                    round_number=round_number,
+                )
+                for round_number, score in enumerate(values, 1)
+            )
+        update_agg_handicaps(AthleteSeason.objects.all())
+        rerank()
+
+        response = self.client.get("/export/rankings.csv")
+        self.assertEqual(response.status_code, 200)
+        rows = list(
+            csv.reader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(rows[0], HEADER)
+        # The athlete with one score isn't ranked
+        self.assertEqual(len(rows), 3)
+
+        expected = (
+            AthleteSeason.objects.filter(overall_rank__isnull=False)
+            .order_by("overall_rank")
+            .values(*ROW_FIELDS)
+        )
+        table = get_handicap_table("wa720_50_c")
+        for row, values, best in zip(
+            rows[1:], expected, [[620, 610, 600], [570, 560, 550]]
+        ):
+            ranking_row = RankingRow(values)
+            self.assertEqual(row[4], str(ranking_row.overall_rank_display))
+            self.assertEqual(row[5], str(ranking_row.age_group_rank_display))
+            self.assertEqual(" ".join(row[7:9]), ranking_row.name)
+            self.assertEqual(row[10], str(ranking_row.agg_handicap))
+            self.assertEqual(row[14::5], [str(score) for score in best])
+            self.assertEqual(row[15::5], [str(table.handicap(score)) for score in best])
+            self.assertEqual(
+                ranking_row.agg_handicap,
+                sum(table.handicap(score) for score in best),
+            )
+
+    def test_invalid_season(self):
+        response = self.client.get("/export/rankings.csv", {"season": "abc"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,96 @@
+import io
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from archerydjango.fields import DbGender
+from junior_rankings.agb_lookup import AthleteLookupClient
+from junior_rankings.models import Athlete, RegisteredAthlete, Score
+from junior_rankings.results_files import import_results_file, iter_xml
+
+from .utils import make_athlete_season, make_event
+
+RESULTS = (
+    "AGB Number,Category,Score\n"
+    "1001,CU18M,600,extra\n"
+    "2001,CU18M,590\n"
+    "3001,CU18M,580\n"
+    "4001,CU18M,570\n"
+)
+
+
+class ImportResultsFileTests(TestCase):
+    def setUp(self):
+        self.event = make_event("e1")
+        make_athlete_season("1001")
+        Athlete.objects.create(
+            agb_number="2001",
+            forename="Adult",
+            surname="Archer",
+            year=1980,
+            gender=DbGender.MALE,
+        )
+        RegisteredAthlete.objects.create(
+            agb_number="3001", data=None, fetched=timezone.now()
+        )
+
+    def import_file(self, **kwargs):
+        return import_results_file(
+            self.event, io.BytesIO(RESULTS.encode()), "results.csv", **kwargs
+        )
+
+    def test_report_counts_skipped_athletes(self):
+        with mock.patch.object(
+            AthleteLookupClient, "lookup_many", return_value=({}, {"4001": None})
+        ):
+            report = self.import_file()
+        self.assertEqual(report["records"], 4)
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(
+            report["skipped"],
+            {"adult": 1, "athlete not found": 1, "athlete lookup failed": 1},
+        )
+
+    def test_dry_run_does_not_look_up_athletes(self):
+        with mock.patch.object(AthleteLookupClient, "lookup_many") as lookup_many:
+            report = self.import_file(dry_run=True)
+        lookup_many.assert_not_called()
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(
+            report["skipped"],
+            {"adult": 1, "athlete not found": 1, "athlete not looked up": 1},
+        )
+        self.assertFalse(Score.objects.exists())
+
+    def test_unknown_category_skipped(self):
+        self.event.round_age_rules = "jas"
+        self.event.save()
+        results = "AGB Number,Category,Score\n1001,CYM,600\n1001,RU16M,500\n"
+        with mock.patch.object(AthleteLookupClient, "lookup_many") as lookup_many:
+            report = import_results_file(
+                self.event, io.BytesIO(results.encode()), "results.csv"
+            )
+        lookup_many.assert_not_called()
+        self.assertEqual(report["records"], 2)
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["skipped"], {"unknown category": 1})
+
+
+class IterXmlTests(TestCase):
+    def test_nested_records(self):
+        results = (
+            "<Results><Event><Name>Junior Open</Name></Event>"
+            "<Archers>"
+            '<Archer AGBNumber="1001"><Category>CU18M</Category><Score>600</Score>'
+            "<Ends><End>60</End></Ends></Archer>"
+            '<Archer AGBNumber="1002" Category="RU16W" Score="550"/>'
+            "</Archers></Results>"
+        )
+        self.assertEqual(
+            list(iter_xml(io.BytesIO(results.encode()))),
+            [
+                {"agb_number": "1001", "category": "CU18M", "score": "600"},
+                {"agb_number": "1002", "category": "RU16W", "score": "550"},
+            ],
+        )
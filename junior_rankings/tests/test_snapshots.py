@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from junior_rankings import freshness, snapshots
+
+
+def render(path):
+    return b"<p>%s</p>" % path.encode(), b'{"path": "%s"}' % path.encode()
+
+
+class ServeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        freshness.touch(freshness.RANKINGS)
+
+    def publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            snapshot = snapshots.publish(render=render)
+        self.assertTrue(snapshot.live)
+        return snapshot
+
+    def test_served_from_cache(self):
+        self.publish()
+        response = self.client.get("/rankings/cm/")
+        self.assertEqual(response.content, b"<p>/rankings/cm/</p>")
+        with self.assertNumQueries(0):
+            response = self.client.get("/rankings/cm/", HTTP_ACCEPT_ENCODING="br")
+            self.assertEqual(response["Content-Encoding"], "br")
+            etag = self.client.get("/rankings/cm/")["ETag"]
+            response = self.client.get("/rankings/cm/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_unpublished_when_ranks_change(self):
+        self.publish()
+        with self.captureOnCommitCallbacks(execute=True):
+            snapshots.unpublish()
+        self.assertEqual(snapshots.live_version(), "")
+        response = self.client.get("/rankings/cm/")
+        self.assertNotEqual(response.content, b"<p>/rankings/cm/</p>")
+
+    def test_live_version_is_read_once(self):
+        snapshot = self.publish()
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(snapshots.live_version(), snapshot.version)
+            self.assertEqual(snapshots.live_version(), snapshot.version)
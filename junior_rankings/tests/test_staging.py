@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from junior_rankings import jobs, staging
+from junior_rankings.models import ImportBatch, Job, Score, StagedScore
+
+from .utils import make_athlete_season, make_event
+
+HEADER = "agb_number,forename,surname,category,score,round\n"
+
+
+def upload(rows):
+    return SimpleUploadedFile("results.csv", (HEADER + rows).encode())
+
+
+class StageCsvTests(TestCase):
+    def setUp(self):
+        self.event = make_event("e1")
+
+    def test_valid_rows_are_staged(self):
+        batch = staging.stage_csv(
+            self.event,
+            upload("1001,A,Archer,CU18M,600,wa720_50_c\n1002,B,Archer,RU16W,550,\n"),
+        )
+        self.assertEqual(batch.rows, 2)
+
+    def test_bad_rows_are_reported(self):
+        rows = (
+            "1001,A,Archer,CU18M,600,wa720_50_c\n"
+            "1002,B,Archer\n"
+            "1003,C,Archer,XU18M,600,\n"
+            "1004,D,Archer,CU18M,-5,\n"
+        )
+        with self.assertRaises(staging.StagingError) as cm:
+            staging.stage_csv(self.event, upload(rows))
+        self.assertEqual(
+            cm.exception.errors,
+            [
+                "Line 3: missing category, score",
+                "Line 4: unknown category XU18M",
+                "Line 5: score -5 is negative",
+            ],
+        )
+        self.assertFalse(ImportBatch.objects.exists())
+        self.assertFalse(StagedScore.objects.exists())
+
+    def test_upload_view_returns_400(self):
+        user = get_user_model().objects.create_superuser("admin", password="x")
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("admin:junior_rankings_event_upload", args=[self.event.pk]),
+            {"file": upload("1002,B,Archer\n")},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(
+            response, "Line 2: missing category, score", status_code=400
+        )
+
+
+class CommitTests(TestCase):
+    def setUp(self):
+        self.event = make_event("e1")
+        make_athlete_season("1001")
+        self.batch = staging.stage_csv(
+            self.event, upload("1001,A,Archer,CU18M,600,wa720_50_c\n")
+        )
+        user = get_user_model().objects.create_superuser("admin", password="x")
+        self.client.force_login(user)
+
+    def test_commit_is_queued(self):
+        url = reverse(
+            "admin:junior_rankings_event_confirm_upload", args=[self.batch.pk]
+        )
+        response = self.client.post(url, {"commit": "Import scores"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Score.objects.exists())
+
+        job = Job.objects.get(kind="commit_import_batch")
+        with self.captureOnCommitCallbacks(execute=True):
+            message = jobs.commit_import_batch(job, **job.params)
+        self.assertEqual(message, "1 new scores imported for %s" % self.event)
+        self.assertEqual(Score.objects.get().score, 600)
+        self.batch.refresh_from_db()
+        self.assertIsNotNone(self.batch.committed)
+        self.assertIn(
+            "already been imported", jobs.commit_import_batch(job, **job.params)
+        )
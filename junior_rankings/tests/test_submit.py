@@ -0,0 +1,48 @@
+import json
+
+from django.test import TestCase
+
+from junior_rankings.models import Job, Submission, SubmissionScore
+
+from .utils import make_athlete_season, make_event
+
+
+class SubmitTests(TestCase):
+    def setUp(self):
+        make_athlete_season("1001")
+        make_athlete_season("1002")
+        make_event("e1")
+
+    def submit(self, agb_number, key):
+        return self.client.post(
+            "/api/submit/",
+            json.dumps(
+                {
+                    "agbNo": agb_number,
+                    "scores": [{"event": "e1", "round": "wa720_50_c", "score": 600}],
+                }
+            ),
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_is_saved_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.submit("1001", "key").status_code, 200)
+            self.assertEqual(self.submit("1001", "key").status_code, 200)
+        self.assertEqual(Submission.objects.count(), 1)
+        self.assertEqual(SubmissionScore.objects.count(), 1)
+        # Submissions aren't scores until they are verified
+        self.assertFalse(Job.objects.exists())
+
+    def test_keys_are_per_athlete(self):
+        self.assertEqual(self.submit("1001", "key").status_code, 200)
+        self.assertEqual(self.submit("1002", "key").status_code, 200)
+        self.assertEqual(
+            sorted(
+                Submission.objects.values_list(
+                    "athlete_season__athlete__agb_number", flat=True
+                )
+            ),
+            ["1001", "1002"],
+        )
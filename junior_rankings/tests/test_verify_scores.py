@@ -0,0 +1,120 @@
+import datetime
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from junior_rankings.models import Job, Score, Submission, SubmissionScore
+
+from .utils import make_athlete_season, make_event
+
+
+class VerifyScoresTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("verifier", password="x")
+        self.client.force_login(user)
+        self.athlete_season = make_athlete_season("1001")
+        self.event = make_event("e1")
+        submission = Submission.objects.create(athlete_season=self.athlete_season)
+        self.scores = [
+            SubmissionScore.objects.create(
+                submission=submission,
+                event=self.event,
+                shot_round="wa720_50_c",
+                score=score,
+            )
+            for score in [600, 610, 500]
+        ]
+
+    def verify(self, scores):
+        return self.client.post(
+            "/api/verify-scores/",
+            json.dumps({"id": str(self.athlete_season.pk), "scores": scores}),
+            content_type="application/json",
+        )
+
+    def test_string_ids(self):
+        # As sent by the verify flow, which reads ids from object keys
+        response = self.verify(
+            [
+                {"id": str(self.scores[0].pk), "accept": True},
+                {"id": str(self.scores[1].pk), "accept": True},
+                {"id": str(self.scores[2].pk), "accept": False},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(
+                Score.objects.order_by("round_number").values_list(
+                    "score", "round_number"
+                )
+            ),
+            [(600, 1), (610, 2)],
+        )
+        self.assertIsNotNone(SubmissionScore.objects.get(pk=self.scores[2].pk).rejected)
+        self.assertFalse(Submission.objects.filter(processed__isnull=True).exists())
+
+    def test_repeat_does_not_duplicate(self):
+        scores = [{"id": str(self.scores[0].pk), "accept": True}]
+        self.verify(scores)
+        self.verify(scores)
+        self.assertEqual(Score.objects.count(), 1)
+
+    def test_queries_do_not_grow_with_scores(self):
+        query_counts = []
+        for scores in [self.scores[:1], self.scores[1:]]:
+            with CaptureQueriesContext(connection) as queries:
+                self.verify([{"id": str(score.pk), "accept": True} for score in scores])
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(Score.objects.count(), 3)
+
+    def test_invalid_id(self):
+        response = self.verify([{"id": "abc", "accept": True}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Score.objects.count(), 0)
+
+    def test_recalculation_is_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.verify([{"id": str(self.scores[0].pk), "accept": True}])
+        job = Job.objects.get()
+        self.assertEqual(job.kind, "refresh_athlete_seasons")
+        self.assertEqual(job.params, {"athlete_season_ids": [self.athlete_season.pk]})
+
+
+class ScoresToVerifyTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("verifier", password="x")
+        self.client.force_login(user)
+        event = make_event("e1")
+        for agb_number, submissions in [("1001", 2), ("1002", 1), ("1003", 1)]:
+            athlete_season = make_athlete_season(agb_number)
+            for i in range(submissions):
+                submission = Submission.objects.create(athlete_season=athlete_season)
+                SubmissionScore.objects.create(
+                    submission=submission,
+                    event=event,
+                    shot_round="wa720_50_c",
+                    score=600,
+                )
+        Submission.objects.filter(athlete_season__athlete__agb_number="1003").update(
+            processed=datetime.date.today()
+        )
+
+    def test_pages(self):
+        rows = []
+        params = {"limit": 1}
+        while True:
+            data = self.client.get("/api/scores-to-verify/", params).json()
+            self.assertEqual(data["count"], 2)
+            self.assertLessEqual(len(data["toVerify"]), 1)
+            rows += data["toVerify"]
+            if data["next"] is None:
+                break
+            params["after"] = data["next"]
+        self.assertEqual(
+            [(row["agbNo"], row["submissions"], row["scores"]) for row in rows],
+            [("1001", 2, 2), ("1002", 1, 1)],
+        )
@@ -0,0 +1,88 @@
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from archerydjango.fields import DbAges, DbBowstyles, DbGender
+from junior_rankings.models import Athlete, AthleteSeason, Event, Season
+
+
+def make_season(year=2025):
+    return Season.objects.get_or_create(year=year)[0]
+
+
+def make_athlete_season(
+    agb_number,
+    season=None,
+    gender=DbGender.MALE,
+    age_group=DbAges.AGE_UNDER_18,
+    bowstyle=DbBowstyles.COMPOUND,
+):
+    athlete = Athlete.objects.create(
+        agb_number=agb_number,
+        forename="Forename%s" % agb_number,
+        surname="Surname%s" % agb_number,
+        year=2009,
+        gender=gender,
+    )
+    return AthleteSeason.objects.create(
+        athlete=athlete,
+        season=season or make_season(),
+        age_group=age_group,
+        bowstyle=bowstyle,
+    )
+
+
+def make_event(identifier, round_family="wa720", date=None):
+    return Event.objects.create(
+        identifier=identifier,
+        name="Event %s" % identifier,
+        date=date or datetime.date(2025, 6, 1),
+        round_family=round_family,
+    )
+
+
+class StubServer(object):
+    """A local HTTP server answering GET requests with ``handle``.
+
+    ``handle`` is called with the query string parameters, and returns the
+    status and the JSON body. Requests are recorded in ``requests``.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {
+                    key: values[0]
+                    for key, values in parse_qs(urlparse(self.path).query).items()
+                }
+                stub.requests.append(params)
+                status, data = stub.handle(params)
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%s/" % self.server.server_port
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
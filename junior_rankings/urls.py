@@ -15,6 +15,7 @@ urlpatterns = [
         "rankings/<slug:division>/", views.Rankings.as_view(), name="division_rankings"
     ),
     path("verify/", views.Verify.as_view(), name="verify"),
+    path("export/rankings.csv", views.RankingsExport.as_view(), name="rankings-export"),
     path(
         "api/athlete-details/", views.AthleteDetails.as_view(), name="athlete-details"
     ),
@@ -24,7 +25,14 @@ urlpatterns = [
         views.AvailableEvents.as_view(),
         name="available-events",
     ),
+    path("api/rankings/", views.RankingsList.as_view(), name="rankings-list"),
     path("api/handicap/", views.Handicap.as_view(), name="handicap"),
+    path("api/handicap-batch/", views.HandicapBatch.as_view(), name="handicap-batch"),
+    path(
+        "api/handicap-table/<slug:round>/",
+        views.RoundHandicaps.as_view(),
+        name="handicap-table",
+    ),
     path("api/submit/", views.Submit.as_view(), name="submit"),
     path("api/contact/", views.Contact.as_view(), name="contact"),
     path(
@@ -1,22 +1,46 @@
-import itertools
+import base64
+import functools
+import hashlib
 import json
 
-from django.http.response import JsonResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.http.response import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView, View
 
 from archerydjango.fields import DbAges, DbBowstyles, DbGender
-from archeryutils.handicaps import handicap_from_score
-from braces.views import CsrfExemptMixin, LoginRequiredMixin
+from braces.views import (
+    CsrfExemptMixin,
+    LoginRequiredMixin,
+    StaffuserRequiredMixin,
+)
 
+from . import freshness, ranking_cache, snapshots
 from .allowed_rounds import all_available_rounds, get_allowed_rounds
+from .exports import ranking_rows, stream_csv
+from .handicap_tables import get_handicap_table
+from .maintenance import refresh_in_worker
 from .models import (
     AthleteSeason,
     ContactResponse,
     Event,
+    Score,
+    Season,
     Submission,
     SubmissionScore,
 )
+from .ranking_tables import (
+    AGE_CODES,
+    division_code,
+    divisions,
+    load_ranking_tables,
+)
 
 
 class Root(TemplateView):
@@ -26,57 +50,97 @@ class Root(TemplateView):
         return super().get_context_data(page_name="root", **kwargs)
 
 
+@method_decorator(
+    freshness.conditional(freshness.RANKINGS, params=["format"], per_user=True),
+    name="get",
+)
 class Rankings(TemplateView):
     template_name = "junior_rankings/rankings.html"
 
-    def get_context_data(self, **kwargs):
-        divisions = itertools.product(DbBowstyles, DbGender)
+    def dispatch(self, request, *args, **kwargs):
+        response = snapshots.serve(request, self.is_json())
+        if response is not None:
+            return response
+        return super().dispatch(request, *args, **kwargs)
 
+    def get(self, request, *args, **kwargs):
+        page = request.path
+        if self.is_json():
+            page += "?format=json"
+        authenticated = request.user.is_authenticated
+        cached = ranking_cache.get_page(page, authenticated)
+        if cached is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+        response = super().get(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        ranking_cache.set_page(page, authenticated, response)
+        return response
+
+    def is_json(self):
+        return self.request.GET.get("format") == "json"
+
+    def get_context_data(self, **kwargs):
         rankings = []
         if self.kwargs.get("division"):
             division = self.kwargs["division"]
             bowstyle = DbBowstyles.__lookup__[division[0].upper()]
             gender = DbGender.__lookup__[division[1].upper()]
+            age = None
+            if self.kwargs.get("age"):
+                age = DbAges.__lookup__["U%s" % self.kwargs["age"]]
+            tables = load_ranking_tables(
+                bowstyle=bowstyle, gender=gender, age_group=age
+            )
             rankings.append(
                 {
                     "name": "%s %s" % (bowstyle, gender),
                     "code": division,
-                    "ranked": AthleteSeason.objects.filter(
-                        overall_rank__isnull=False,
-                        athlete__gender=gender,
-                        bowstyle=bowstyle,
-                    ).order_by("overall_rank", "athlete__surname"),
+                    "ranked": tables.get((bowstyle, gender), []),
                     "is_division": True,
                 }
             )
 
-            if self.kwargs.get("age"):
-                age = DbAges.__lookup__["U%s" % self.kwargs["age"]]
-                rankings[-1]["ranked"] = rankings[-1]["ranked"].filter(
-                    age_group=age,
-                )
+            if age:
                 rankings[-1]["name"] = "%s %s %s" % (age, bowstyle, gender)
                 rankings[-1]["is_age"] = True
         else:
-            for bowstyle, gender in divisions:
+            tables = load_ranking_tables(top=3)
+            for bowstyle, gender in divisions():
                 rankings.append(
                     {
                         "name": "%s %s" % (bowstyle, gender),
-                        "code": ("%s%s" % (str(bowstyle)[0], str(gender)[0])).lower(),
-                        "ranked": AthleteSeason.objects.filter(
-                            overall_rank__lte=3,
-                            athlete__gender=gender,
-                            bowstyle=bowstyle,
-                        ).order_by("overall_rank", "athlete__surname"),
+                        "code": division_code(bowstyle, gender),
+                        "ranked": tables.get((bowstyle, gender), []),
                         "is_top": True,
                     }
                 )
 
-        ages = [str(age)[-2:] for age in list(DbAges)[2:]]
         return super().get_context_data(
-            page_name="rankings", rankings=rankings, ages=ages, **kwargs
+            page_name="rankings", rankings=rankings, ages=AGE_CODES, **kwargs
         )
 
+    def render_to_response(self, context, **response_kwargs):
+        if self.is_json():
+            return JsonResponse(self.get_json_data(context))
+        return super().render_to_response(context, **response_kwargs)
+
+    def get_json_data(self, context):
+        return {
+            "rankings": [
+                {
+                    "name": division["name"],
+                    "code": division["code"],
+                    "ranked": [
+                        row.as_dict(is_age=division.get("is_age", False))
+                        for row in division["ranked"]
+                    ],
+                }
+                for division in context["rankings"]
+            ]
+        }
+
 
 class Verify(LoginRequiredMixin, TemplateView):
     template_name = "junior_rankings/verify.html"
@@ -109,6 +173,9 @@ class AthleteSeasonByAgbNo(object):
         return athlete_season
 
 
+@method_decorator(
+    freshness.conditional(freshness.ATHLETES, params=["agb_number"]), name="get"
+)
 class AthleteDetails(AthleteSeasonByAgbNo, View):
     def get(self, request, *args, **kwargs):
         try:
@@ -127,13 +194,21 @@ class AthleteDetails(AthleteSeasonByAgbNo, View):
         )
 
 
+@method_decorator(
+    freshness.conditional(
+        freshness.ATHLETES, freshness.EVENTS, freshness.SCORES, params=["agb_number"]
+    ),
+    name="get",
+)
 class AthleteScores(AthleteSeasonByAgbNo, View):
     def get(self, request, *args, **kwargs):
         try:
             athlete_season = self.load_athlete_season()
         except ResponseException as e:
             return e.response
-        scores = athlete_season.score_set.all()
+        scores = athlete_season.score_set.select_related("event").order_by(
+            "handicap", "-score"
+        )
         return JsonResponse(
             {
                 "scores": [
@@ -146,12 +221,18 @@ class AthleteScores(AthleteSeasonByAgbNo, View):
                         "date": score.event.date,
                         "handicap": score.handicap,
                     }
-                    for score in sorted(scores, key=lambda s: (s.handicap, -s.score))
+                    for score in scores
                 ]
             }
         )
 
 
+@method_decorator(
+    freshness.conditional(
+        freshness.ATHLETES, freshness.EVENTS, freshness.SCORES, params=["agb_number"]
+    ),
+    name="get",
+)
 class AvailableEvents(AthleteSeasonByAgbNo, View):
     def get(self, request, *args, **kwargs):
         try:
@@ -172,6 +253,7 @@ class AvailableEvents(AthleteSeasonByAgbNo, View):
                             {
                                 "codename": r.codename,
                                 "name": r.name,
+                                "handicapTable": handicap_table_url(r.codename),
                             }
                             for r in get_allowed_rounds(
                                 event.round_family,
@@ -187,6 +269,201 @@ class AvailableEvents(AthleteSeasonByAgbNo, View):
         )
 
 
+@method_decorator(
+    freshness.conditional(
+        freshness.RANKINGS,
+        params=["season", "bowstyle", "gender", "age", "after", "limit", "stream"],
+    ),
+    name="get",
+)
+class RankingsList(View):
+    """Ranked athletes as JSON, a page at a time or streamed as NDJSON.
+
+    Pages are keyset paginated on (rank, surname, id): pass the ``next`` value
+    of one page as ``after`` to get the following page. Athletes without a
+    rank, as in age groups which aren't ranked, come last.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    fields = [
+        "id",
+        "season__year",
+        "bowstyle",
+        "athlete__gender",
+        "age_group",
+        "athlete__forename",
+        "athlete__surname",
+        "agg_handicap",
+        "overall_rank",
+        "overall_rank_is_equal",
+        "age_group_rank",
+        "age_group_rank_is_equal",
+    ]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            seasons, rank_field = self.get_queryset()
+            after = self.get_after()
+            limit = self.get_limit()
+        except ResponseException as e:
+            return e.response
+
+        seasons = seasons.order_by(
+            F(rank_field).asc(nulls_last=True), "athlete__surname", "id"
+        )
+        if after is not None:
+            rank, surname, pk = after
+            later = Q(athlete__surname__gt=surname) | Q(
+                athlete__surname=surname, id__gt=pk
+            )
+            if rank is None:
+                seasons = seasons.filter(later, **{"%s__isnull" % rank_field: True})
+            else:
+                seasons = seasons.filter(
+                    Q(**{"%s__gt" % rank_field: rank})
+                    | Q(**{"%s__isnull" % rank_field: True})
+                    | Q(later, **{rank_field: rank})
+                )
+        rows = seasons.values(*self.fields)
+
+        if request.GET.get("stream") == "1":
+            return StreamingHttpResponse(
+                (
+                    json.dumps(self.serialise(row)) + "\n"
+                    for row in rows.iterator(chunk_size=2000)
+                ),
+                content_type="application/x-ndjson",
+            )
+
+        rows = list(rows[: limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(
+                last[rank_field], last["athlete__surname"], last["id"]
+            )
+        return JsonResponse(
+            {"results": [self.serialise(row) for row in rows], "next": next_cursor}
+        )
+
+    def get_queryset(self):
+        params = self.request.GET
+        seasons = AthleteSeason.objects.filter(overall_rank__isnull=False)
+        if "season" in params:
+            try:
+                seasons = seasons.filter(season__year=int(params["season"]))
+            except ValueError:
+                raise ResponseException("Invalid parameter: season", 400)
+        else:
+            seasons = seasons.filter(
+                season=Season.objects.order_by("-year").values("pk")[:1]
+            )
+        lookups = [
+            ("bowstyle", "bowstyle", DbBowstyles),
+            ("gender", "athlete__gender", DbGender),
+        ]
+        for param, field, enum in lookups:
+            if param in params:
+                try:
+                    seasons = seasons.filter(**{field: enum.__lookup__[params[param]]})
+                except KeyError:
+                    raise ResponseException("Invalid parameter: %s" % param, 400)
+        rank_field = "overall_rank"
+        if "age" in params:
+            try:
+                age = DbAges.__lookup__[params["age"].upper()]
+            except KeyError:
+                raise ResponseException("Invalid parameter: age", 400)
+            seasons = seasons.filter(age_group=age)
+            rank_field = "age_group_rank"
+        return seasons, rank_field
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get("limit", self.default_limit))
+        except ValueError:
+            raise ResponseException("Invalid parameter: limit", 400)
+        return max(1, min(limit, self.max_limit))
+
+    def get_after(self):
+        if "after" not in self.request.GET:
+            return None
+        try:
+            rank, surname, pk = json.loads(
+                base64.urlsafe_b64decode(self.request.GET["after"])
+            )
+            return None if rank is None else int(rank), str(surname), int(pk)
+        except (ValueError, TypeError):
+            raise ResponseException("Invalid parameter: after", 400)
+
+    def encode_cursor(self, rank, surname, pk):
+        return base64.urlsafe_b64encode(
+            json.dumps([rank, surname, pk]).encode()
+        ).decode()
+
+    def serialise(self, row):
+        return {
+            "season": row["season__year"],
+            "name": "%s %s" % (row["athlete__forename"], row["athlete__surname"]),
+            "division": row["bowstyle"].label,
+            "gender": row["athlete__gender"].label,
+            "age": row["age_group"].label,
+            "handicap": row["agg_handicap"],
+            "rank": row["overall_rank"],
+            "rankIsEqual": row["overall_rank_is_equal"],
+            "ageGroupRank": row["age_group_rank"],
+            "ageGroupRankIsEqual": row["age_group_rank_is_equal"],
+        }
+
+
+class RankingsExport(StaffuserRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        seasons = AthleteSeason.objects.all()
+        if "season" in request.GET:
+            try:
+                seasons = seasons.filter(season__year=int(request.GET["season"]))
+            except ValueError:
+                return ResponseException("Invalid parameter: season", 400).response
+        response = StreamingHttpResponse(
+            stream_csv(ranking_rows(seasons)), content_type="text/csv"
+        )
+        response["Content-Disposition"] = 'attachment; filename="rankings.csv"'
+        return response
+
+
+def handicap_etag(request, *args, **kwargs):
+    # Handicaps for a round and score only change with the code
+    parts = [
+        settings.SOURCE_VERSION,
+        request.path,
+        request.GET.get("round", ""),
+        request.GET.get("score", ""),
+    ]
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def cache_successful(**cache_kwargs):
+    """Set Cache-Control on successful responses, so errors aren't cached."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                patch_cache_control(response, **cache_kwargs)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@method_decorator(condition(etag_func=handicap_etag), name="get")
+@method_decorator(
+    cache_successful(public=True, max_age=settings.HTTP_CACHE_MAX_AGE), name="get"
+)
 class Handicap(View):
     def get(self, request, *args, **kwargs):
         try:
@@ -200,37 +477,168 @@ class Handicap(View):
             raise ResponseException("Missing parameter: round", 400)
         if "score" not in self.request.GET:
             raise ResponseException("Missing parameter: score", 400)
-        if self.request.GET["round"] not in all_available_rounds:
-            raise ResponseException("Invalid parameter: round", 400)
-        try:
-            score = int(self.request.GET["score"])
-        except ValueError:
-            raise ResponseException("Invalid parameter: score", 400)
-        rnd = all_available_rounds[self.request.GET["round"]]
+        return calculate_handicap(self.request.GET["round"], self.request.GET["score"])
+
+
+def calculate_handicap(round_codename, score):
+    if round_codename not in all_available_rounds:
+        raise ResponseException("Invalid parameter: round", 400)
+    try:
+        score = int(score)
+    except (TypeError, ValueError):
+        raise ResponseException("Invalid parameter: score", 400)
+    table = get_handicap_table(round_codename)
+    if not table.is_valid_score(score):
+        raise ResponseException("Invalid score", 400)
+    return table.handicap(score)
+
+
+class HandicapBatch(CsrfExemptMixin, View):
+    max_scores = 500
+
+    def post(self, request, *args, **kwargs):
         try:
-            return handicap_from_score(score, rnd, "AGB", int_prec=True)
-        except ValueError:
-            raise ResponseException("Invalid score", 400)
+            scores = json.loads(request.body)["scores"]
+        except (ValueError, KeyError, TypeError):
+            return ResponseException("Missing parameter: scores", 400).response
+        if not isinstance(scores, list) or not all(
+            isinstance(score, dict) for score in scores
+        ):
+            return ResponseException("Invalid parameter: scores", 400).response
+        if len(scores) > self.max_scores:
+            return ResponseException("Too many scores", 400).response
+
+        handicaps = []
+        for score in scores:
+            result = {"round": score.get("round"), "score": score.get("score")}
+            try:
+                result["handicap"] = calculate_handicap(
+                    score.get("round"), score.get("score")
+                )
+            except ResponseException as e:
+                result["error"] = str(e)
+            handicaps.append(result)
+        return JsonResponse({"handicaps": handicaps})
+
+
+def handicap_table_url(codename):
+    """URL of a round's handicap table, which changes with each release."""
+    return "%s?v=%s" % (
+        reverse("handicap-table", kwargs={"round": codename}),
+        settings.SOURCE_VERSION,
+    )
+
+
+@method_decorator(condition(etag_func=handicap_etag), name="get")
+class RoundHandicaps(View):
+    def get(self, request, *args, **kwargs):
+        if kwargs["round"] not in all_available_rounds:
+            return ResponseException("Round not found", 404).response
+        table = get_handicap_table(kwargs["round"])
+        response = JsonResponse(
+            {
+                "round": table.round.codename,
+                "name": table.round.name,
+                "maxScore": table.max_score,
+                "handicaps": table.as_list(),
+            }
+        )
+        if request.GET.get("v") == settings.SOURCE_VERSION:
+            # Versioned by handicap_table_url, so can be kept for good
+            patch_cache_control(
+                response, public=True, max_age=365 * 24 * 60 * 60, immutable=True
+            )
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE
+            )
+        return response
 
 
 class Submit(CsrfExemptMixin, View):
     def post(self, request, *args, **kwargs):
         data = json.loads(request.body)
-        # FIXME This will break if anyone has double bow styles but there aren't any (yet!)
-        athlete_season = AthleteSeason.objects.get(
-            athlete__agb_number=data["agbNo"],
-            season__year=2025,
+        # Apps on flaky connections retry with the same key
+        key = request.headers.get("Idempotency-Key") or data.get("idempotencyKey")
+        if key and len(key) > 64:
+            return ResponseException("Invalid idempotency key", 400).response
+        try:
+            # FIXME This will break if anyone has double bow styles but there aren't any (yet!)
+            try:
+                athlete_season = AthleteSeason.objects.select_related("athlete").get(
+                    athlete__agb_number=data["agbNo"],
+                    season__year=2025,
+                )
+            except (AthleteSeason.DoesNotExist, KeyError):
+                raise ResponseException("Athlete not found", 404)
+            if self.already_submitted(athlete_season, key):
+                return JsonResponse({"status": "ok"})
+            scores = self.validate_scores(athlete_season, data["scores"])
+        except ResponseException as e:
+            return e.response
+        try:
+            with transaction.atomic():
+                submission = Submission.objects.create(
+                    athlete_season=athlete_season, idempotency_key=key or None
+                )
+                for score in scores:
+                    score.submission = submission
+                SubmissionScore.objects.bulk_create(scores)
+        except IntegrityError:
+            # A retry which arrived while the first attempt was being saved
+            if self.already_submitted(athlete_season, key):
+                return JsonResponse({"status": "ok"})
+            raise
+        return JsonResponse({"status": "ok"})
+
+    def already_submitted(self, athlete_season, key):
+        return bool(key) and (
+            Submission.objects.filter(
+                athlete_season=athlete_season, idempotency_key=key
+            ).exists()
         )
-        submission = Submission.objects.create(athlete_season=athlete_season)
-        for score in data["scores"]:
-            event = Event.objects.get(identifier=score["event"])
-            SubmissionScore.objects.create(
-                submission=submission,
-                event=event,
-                shot_round=score["round"],
-                score=score["score"],
+
+    def validate_scores(self, athlete_season, scores):
+        """Check every score, returning them unsaved.
+
+        Events are looked up in one query, and rounds checked against those
+        the athlete may shoot at each event.
+        """
+        events = {
+            event.identifier: event
+            for event in Event.objects.filter(
+                identifier__in={score.get("event") for score in scores}
             )
-        return JsonResponse({"status": "ok"})
+        }
+        athlete = athlete_season.athlete
+        submission_scores = []
+        for score in scores:
+            event = events.get(score.get("event"))
+            if event is None:
+                raise ResponseException("Invalid event: %s" % score.get("event"), 400)
+            if score.get("round") not in all_available_rounds:
+                raise ResponseException("Invalid round: %s" % score.get("round"), 400)
+            allowed_rounds = get_allowed_rounds(
+                event.round_family,
+                athlete.gender,
+                athlete_season.age_group,
+                athlete_season.bowstyle,
+            )
+            if score["round"] not in {r.codename for r in allowed_rounds}:
+                raise ResponseException(
+                    "Round %s not allowed at %s" % (score["round"], event.identifier),
+                    400,
+                )
+            try:
+                value = int(score["score"])
+            except (KeyError, TypeError, ValueError):
+                raise ResponseException("Invalid score: %s" % score.get("score"), 400)
+            if not get_handicap_table(score["round"]).is_valid_score(value):
+                raise ResponseException("Invalid score: %s" % score["score"], 400)
+            submission_scores.append(
+                SubmissionScore(event=event, shot_round=score["round"], score=value)
+            )
+        return submission_scores
 
 
 class Contact(CsrfExemptMixin, View):
@@ -245,38 +653,108 @@ class Contact(CsrfExemptMixin, View):
 
 
 class ScoresToVerify(LoginRequiredMixin, View):
+    """Athletes with unprocessed submissions, a page at a time.
+
+    Pages are keyset paginated on (division, gender, age, id): pass the
+    ``next`` value of one page as ``after`` to get the following page.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    ordering = [
+        "athlete_season__bowstyle",
+        "athlete_season__athlete__gender",
+        "athlete_season__age_group",
+        "athlete_season_id",
+    ]
+
     def get(self, request, *args, **kwargs):
-        submissions = (
-            Submission.objects.filter(
-                processed__isnull=True,
+        try:
+            after = self.get_after()
+            limit = self.get_limit()
+        except ResponseException as e:
+            return e.response
+
+        # Grouped by athlete season, so each row counts an athlete's
+        # unprocessed submissions and their scores
+        queue = (
+            Submission.objects.filter(processed__isnull=True)
+            .values(
+                "athlete_season__athlete__agb_number",
+                "athlete_season__athlete__forename",
+                "athlete_season__athlete__surname",
+                *self.ordering,
             )
-            .select_related("athlete_season", "athlete_season__athlete")
-            .prefetch_related(
-                "submissionscore_set",
-                "submissionscore_set__event",
-                "athlete_season__score_set",
-                "athlete_season__score_set__event",
+            .annotate(
+                submissions=Count("id", distinct=True),
+                scores=Count("submissionscore"),
             )
+            .order_by(*self.ordering)
         )
-
-        data = {}
-        for sub in submissions:
-            athlete_season = sub.athlete_season
-            athlete = athlete_season.athlete
-            if athlete_season.id not in data:
-                data[athlete_season.id] = {
-                    "id": athlete_season.id,
-                    "agbNo": athlete.agb_number,
-                    "name": athlete.name,
-                    "gender": athlete.gender.label,
-                    "age": athlete_season.age_group.label,
-                    "division": athlete_season.bowstyle.label,
-                }
-        to_verify = sorted(
-            data.values(),
-            key=lambda a: (a["division"], a["gender"], a["age"], a["agbNo"]),
+        if after is not None:
+            after_q = Q()
+            for i, field in enumerate(self.ordering):
+                after_q |= Q(
+                    **dict(zip(self.ordering[:i], after[:i])),
+                    **{"%s__gt" % field: after[i]},
+                )
+            queue = queue.filter(after_q)
+
+        rows = list(queue[: limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor([rows[-1][f] for f in self.ordering])
+        total = Submission.objects.filter(processed__isnull=True).aggregate(
+            athletes=Count("athlete_season", distinct=True)
+        )["athletes"]
+        return JsonResponse(
+            {
+                "status": "ok",
+                "toVerify": [self.serialise(row) for row in rows],
+                "next": next_cursor,
+                "count": total,
+            }
         )
-        return JsonResponse({"status": "ok", "toVerify": to_verify})
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get("limit", self.default_limit))
+        except ValueError:
+            raise ResponseException("Invalid parameter: limit", 400)
+        return max(1, min(limit, self.max_limit))
+
+    def get_after(self):
+        if "after" not in self.request.GET:
+            return None
+        try:
+            after = json.loads(base64.urlsafe_b64decode(self.request.GET["after"]))
+            if len(after) != len(self.ordering):
+                raise ValueError
+            return [int(value) for value in after]
+        except (ValueError, TypeError):
+            raise ResponseException("Invalid parameter: after", 400)
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(
+            json.dumps([int(value) for value in values]).encode()
+        ).decode()
+
+    def serialise(self, row):
+        return {
+            "id": row["athlete_season_id"],
+            "agbNo": row["athlete_season__athlete__agb_number"],
+            "name": "%s %s"
+            % (
+                row["athlete_season__athlete__forename"],
+                row["athlete_season__athlete__surname"],
+            ),
+            "gender": row["athlete_season__athlete__gender"].label,
+            "age": row["athlete_season__age_group"].label,
+            "division": row["athlete_season__bowstyle"].label,
+            "submissions": row["submissions"],
+            "scores": row["scores"],
+        }
 
 
 class SubmissionDetails(LoginRequiredMixin, View):
@@ -297,12 +775,13 @@ class SubmissionDetails(LoginRequiredMixin, View):
                 "handicap": score.handicap,
                 "verified": True,
             }
-            for score in sorted(season.score_set.all(), key=lambda s: s.handicap)
+            for score in season.score_set.select_related("event").order_by("handicap")
         ]
 
-        submitted = sorted(
-            SubmissionScore.objects.filter(submission__athlete_season=season).all(),
-            key=lambda s: s.handicap,
+        submitted = (
+            SubmissionScore.objects.filter(athlete_season=season)
+            .select_related("event")
+            .order_by("handicap")
         )
         new_scores = [
             {
@@ -323,21 +802,64 @@ class SubmissionDetails(LoginRequiredMixin, View):
 class VerifyScores(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         data = json.loads(request.body)
-        for score in data["scores"]:
-            submission_score = SubmissionScore.objects.get(id=score["id"])
-            submission = submission_score.submission
-            athlete_season = submission.athlete_season
-            if score["accept"]:
-                submission_score.accepted = timezone.now()
-                athlete_season.score_set.create(
-                    event=submission_score.event,
-                    shot_round=submission_score.shot_round,
-                    score=submission_score.score,
+        try:
+            athlete_season_id = int(data["id"])
+            accept = {
+                int(score["id"]): bool(score["accept"]) for score in data["scores"]
+            }
+        except (KeyError, TypeError, ValueError):
+            return ResponseException("Invalid scores", 400).response
+        now = timezone.now()
+        # Athlete seasons are recalculated by the worker, not in the request
+        with refresh_in_worker(), transaction.atomic():
+            # Scores and their submissions are locked so two verifiers can't
+            # both accept a score, and scores already decided are left alone
+            submission_scores = list(
+                SubmissionScore.objects.select_for_update(of=("self", "submission"))
+                .filter(pk__in=accept, accepted__isnull=True, rejected__isnull=True)
+                .select_related("submission")
+                .order_by("pk")
+            )
+            accepted = [s for s in submission_scores if accept[s.pk]]
+            # Scores accepted for an event already shot are further rounds
+            shot_at_event = {
+                (row["athlete_season_id"], row["event_id"]): row["shot"]
+                for row in Score.objects.filter(
+                    athlete_season_id__in={
+                        s.submission.athlete_season_id for s in accepted
+                    },
+                    event_id__in={s.event_id for s in accepted},
                 )
-            else:
-                submission_score.rejected = timezone.now()
-            submission_score.save()
-        Submission.objects.filter(athlete_season_id=data["id"]).update(
-            processed=timezone.now()
-        )
+                .values("athlete_season_id", "event_id")
+                .annotate(shot=Max("round_number"))
+            }
+            scores = []
+            for submission_score in accepted:
+                key = (
+                    submission_score.submission.athlete_season_id,
+                    submission_score.event_id,
+                )
+                shot_at_event[key] = shot_at_event.get(key, 0) + 1
+                scores.append(
+                    Score(
+                        athlete_season_id=key[0],
+                        event_id=key[1],
+                        shot_round=submission_score.shot_round,
+                        score=submission_score.score,
+                        round_number=shot_at_event[key],
+                    )
+                )
+            for submission_score in submission_scores:
+                if accept[submission_score.pk]:
+                    submission_score.accepted = now
+                else:
+                    submission_score.rejected = now
+            # Athlete seasons are recalculated once, when this commits
+            Score.objects.bulk_create(scores)
+            SubmissionScore.objects.bulk_update(
+                submission_scores, ["accepted", "rejected"]
+            )
+            Submission.objects.filter(athlete_season_id=athlete_season_id).update(
+                processed=now
+            )
         return JsonResponse({"status": "ok"})